@@ -0,0 +1,146 @@
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+
+from utils.docx_text import iter_docx_blocks
+
+NAMESPACE = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+SPEC_WORDS = (
+    "contractor shall provide install concrete reinforcing steel anchor bolts framing lumber sheathing "
+    "fasteners per manufacturer requirements comply with applicable code submit shop drawings for review "
+    "prior to fabrication all work to be inspected before concealment"
+).split()
+
+
+def paragraph(text: str) -> str:
+    return f"<w:p><w:r><w:t xml:space=\"preserve\">{escape(text)}</w:t></w:r></w:p>"
+
+
+def cell(text: str, span: int = 1) -> str:
+    properties = f"<w:tcPr><w:gridSpan w:val=\"{span}\"/></w:tcPr>" if span > 1 else ""
+    return f"<w:tc>{properties}{paragraph(text)}</w:tc>"
+
+
+def spec_body(rng: random.Random, sections: int, tables: int, rows: int, columns: int) -> str:
+    body = []
+    for section in range(sections):
+        body.append(paragraph(f"SECTION {section:02d} {rng.choice(SPEC_WORDS).upper()}"))
+        for _ in range(rng.randint(4, 12)):
+            body.append(paragraph(" ".join(rng.choice(SPEC_WORDS) for _ in range(rng.randint(12, 40)))))
+        if section % max(1, sections // max(1, tables)) == 0 and tables:
+            tables -= 1
+            table = ["<w:tbl><w:tblPr/><w:tblGrid>" + "<w:gridCol/>" * columns + "</w:tblGrid>"]
+            table.append("<w:tr>" + "".join(cell(f"Column {column}") for column in range(columns)) + "</w:tr>")
+            for row in range(rows):
+                # Every fifth row merges its first two cells, as door and finish schedules do.
+                if row % 5 == 0:
+                    cells = [cell(f"Group {row}", span=2)] + [cell(f"{rng.randint(1, 999)}") for _ in range(columns - 2)]
+                else:
+                    cells = [cell(f"R{row}C{column} {rng.choice(SPEC_WORDS)}") for column in range(columns)]
+                table.append("<w:tr>" + "".join(cells) + "</w:tr>")
+            table.append("</w:tbl>")
+            body.append("".join(table))
+    return f"<?xml version=\"1.0\" encoding=\"UTF-8\" standalone=\"yes\"?><w:document {NAMESPACE}><w:body>{''.join(body)}<w:sectPr/></w:body></w:document>"
+
+
+# Starts from a python-docx document with a header and footer, then swaps in a
+# generated body; building a body this size through python-docx takes minutes.
+def write_fixture(path: str, sections: int, tables: int, rows: int, columns: int):
+    template = path + ".template.docx"
+    document = Document()
+    document.sections[0].header.paragraphs[0].text = "PROJECT MANUAL - ACCESSORY STRUCTURE PERMIT SET"
+    document.sections[0].footer.paragraphs[0].text = "Issued for permit"
+    document.add_paragraph("placeholder")
+    document.save(template)
+
+    with zipfile.ZipFile(template) as source, zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            if item.filename == "word/document.xml":
+                body = spec_body(random.Random(3), sections, tables, rows, columns)
+                # Keep the section properties python-docx wrote so the header/footer references survive.
+                section_properties = data[data.rindex(b"<w:sectPr"):data.rindex(b"</w:body>")].decode("utf-8")
+                namespaces = data[data.index(b"<w:document"):data.index(b">", data.index(b"<w:document")) + 1].decode("utf-8")
+                data = body.replace(f"<w:document {NAMESPACE}>", namespaces).replace("<w:sectPr/>", section_properties).encode("utf-8")
+            target.writestr(item, data)
+    os.unlink(template)
+
+
+def python_docx_text(file_path: str) -> str:
+    doc = Document(file_path)
+    parts = [paragraph.text + "\n" for paragraph in doc.paragraphs]
+    for table in doc.tables:
+        for row in table.rows:
+            parts.extend(cell.text + " " for cell in row.cells)
+            parts.append("\n")
+    return "".join(parts).strip()
+
+
+def streaming_text(file_path: str) -> str:
+    return "\n".join(iter_docx_blocks(file_path))
+
+
+EXTRACTORS = {"python-docx": python_docx_text, "streaming": streaming_text}
+
+
+def measure(name: str, file_path: str, results):
+    start = time.perf_counter()
+    text = EXTRACTORS[name](file_path)
+    results.put((time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, len(text)))
+
+
+def run_isolated(name: str, file_path: str):
+    # Each run gets a fresh process so peak RSS reflects only that extractor.
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=measure, args=(name, file_path, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare python-docx extraction with the streaming XML extractor.")
+    parser.add_argument("--path", help="existing .docx to measure; a synthetic spec book is generated if omitted")
+    parser.add_argument("--sections", type=int, default=400)
+    parser.add_argument("--tables", type=int, default=40)
+    parser.add_argument("--rows", type=int, default=60)
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="docx-bench-")
+    try:
+        path = args.path
+        if not path:
+            path = os.path.join(workdir, "spec_book.docx")
+            write_fixture(path, args.sections, args.tables, args.rows, args.columns)
+        print(f"fixture: {os.path.getsize(path) / 1e6:.1f} MB compressed")
+
+        baseline = None
+        print(f"{'extractor':<14}{'median s':>10}{'peak RSS MB':>13}{'chars':>11}{'speedup':>9}")
+        for name in EXTRACTORS:
+            runs = [run_isolated(name, path) for _ in range(args.runs)]
+            seconds = statistics.median(run[0] for run in runs)
+            baseline = baseline or seconds
+            print(f"{name:<14}{seconds:>10.2f}{max(run[1] for run in runs) / 1024:>13.0f}{runs[0][2]:>11}{baseline / seconds:>8.1f}x")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
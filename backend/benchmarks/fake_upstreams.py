@@ -0,0 +1,207 @@
+import argparse
+import asyncio
+import base64
+import io
+import json
+import math
+import random
+import time
+import uuid
+from typing import Any, Dict
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from PIL import Image, ImageDraw
+
+# Route groups share a latency distribution and error profile. Latencies are
+# log-normal around the median with the given sigma, which gives the long
+# right tail real upstreams have.
+PROFILES: Dict[str, Dict[str, float]] = {
+    "chat": {"median_ms": 1200, "sigma": 0.5, "error_rate": 0.0, "rate_limit_rate": 0.0},
+    "stream": {"median_ms": 40, "sigma": 0.4, "error_rate": 0.0, "rate_limit_rate": 0.0},
+    "images": {"median_ms": 6000, "sigma": 0.3, "error_rate": 0.0, "rate_limit_rate": 0.0},
+    "geocode": {"median_ms": 120, "sigma": 0.4, "error_rate": 0.0, "rate_limit_rate": 0.0},
+    "zoning": {"median_ms": 300, "sigma": 0.8, "error_rate": 0.0, "rate_limit_rate": 0.0},
+}
+
+FEASIBILITY_RESPONSE = {
+    "verdict": "Feasible",
+    "confidence_score": 82,
+    "compliance_summary": "The proposed structure appears to meet height, setback and coverage limits for the district.",
+    "issues": ["Confirm rear setback on the survey"],
+    "recommendations": ["Submit a plat of survey with the application"],
+    "required_permits": ["Building Permit", "Zoning Permit"]
+}
+
+REVIEW_RESPONSE = {
+    "rejection_risk": "Medium",
+    "confidence_score": 74,
+    "risk_summary": "Plans are mostly complete but some dimensions are missing.",
+    "overall_assessment": "Application is close to complete.",
+    "issues": [{"category": "Site Plan", "description": "Setback dimensions are not labeled", "severity": "Medium"}],
+    "fixes": [{"category": "Site Plan", "description": "Label all setbacks on the site plan", "priority": "High"}],
+    "missing_documents": ["Plat of survey"],
+    "compliance_check": {"setbacks": "warning", "height": "pass"}
+}
+
+NARRATIVE_WORDS = (
+    "The project consists of a detached accessory structure built on a monolithic slab with "
+    "thickened edges, wood framed walls at sixteen inches on center, engineered roof trusses and "
+    "asphalt shingle roofing installed over synthetic underlayment in accordance with local code."
+).split()
+
+app = FastAPI(title="Fake upstreams")
+stats: Dict[str, Dict[str, int]] = {}
+
+
+def sample_latency(profile: Dict[str, float]) -> float:
+    return profile["median_ms"] * math.exp(random.gauss(0, profile["sigma"])) / 1000
+
+
+async def simulate(group: str) -> Any:
+    profile = PROFILES[group]
+    counters = stats.setdefault(group, {"requests": 0, "errors": 0, "rate_limited": 0})
+    counters["requests"] += 1
+
+    await asyncio.sleep(sample_latency(profile))
+
+    roll = random.random()
+    if roll < profile["rate_limit_rate"]:
+        counters["rate_limited"] += 1
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={"retry-after": "1"}
+        )
+    if roll < profile["rate_limit_rate"] + profile["error_rate"]:
+        counters["errors"] += 1
+        return JSONResponse({"error": {"message": "Upstream failure", "type": "server_error"}}, status_code=503)
+    return None
+
+
+def chat_content(messages: list) -> str:
+    system = " ".join(message.get("content", "") for message in messages if message.get("role") == "system").lower()
+    if "permit reviewer" in system:
+        return json.dumps(REVIEW_RESPONSE)
+    if "permit analyst" in system:
+        return json.dumps(FEASIBILITY_RESPONSE)
+    return " ".join(NARRATIVE_WORDS)
+
+
+def render_image(prompt: str, size: int = 1024) -> bytes:
+    seed = random.Random(prompt)
+    image = Image.new("RGB", (size, size), (seed.randrange(256), seed.randrange(256), seed.randrange(256)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = seed.randrange(size), seed.randrange(size)
+        draw.rectangle([x, y, x + seed.randrange(64, 320), y + seed.randrange(64, 320)], fill=(seed.randrange(256), seed.randrange(256), seed.randrange(256)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def completion_envelope(model: str, **fields) -> Dict[str, Any]:
+    return {"id": f"chatcmpl-{uuid.uuid4().hex[:24]}", "created": int(time.time()), "model": model, **fields}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "gpt-4o")
+    content = chat_content(body.get("messages", []))
+
+    if not body.get("stream"):
+        failure = await simulate("chat")
+        if failure:
+            return failure
+        return completion_envelope(
+            model,
+            object="chat.completion",
+            choices=[{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            usage={"prompt_tokens": 500, "completion_tokens": len(content) // 4, "total_tokens": 500 + len(content) // 4}
+        )
+
+    failure = await simulate("stream")
+    if failure:
+        return failure
+
+    async def chunks():
+        envelope = completion_envelope(model, object="chat.completion.chunk")
+        for word in content.split(" "):
+            await asyncio.sleep(sample_latency(PROFILES["stream"]))
+            delta = {"index": 0, "delta": {"content": word + " "}, "finish_reason": None}
+            yield f"data: {json.dumps({**envelope, 'choices': [delta]})}\n\n"
+        yield f"data: {json.dumps({**envelope, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+@app.post("/v1/images/generations")
+async def image_generations(request: Request):
+    body = await request.json()
+    failure = await simulate("images")
+    if failure:
+        return failure
+    image = {"revised_prompt": body.get("prompt")}
+    if body.get("response_format") == "b64_json":
+        image["b64_json"] = base64.b64encode(render_image(body.get("prompt", ""))).decode("ascii")
+    else:
+        image["url"] = f"http://fake-upstreams.local/images/{uuid.uuid4().hex}.png"
+    return {"created": int(time.time()), "data": [image]}
+
+
+@app.get("/maps/api/geocode/json")
+async def geocode(address: str = ""):
+    failure = await simulate("geocode")
+    if failure:
+        return {"status": "OVER_QUERY_LIMIT", "results": []}
+    seed = random.Random(address)
+    return {
+        "status": "OK",
+        "results": [{"geometry": {"location": {"lat": 43.0 + seed.random() * 0.2, "lng": -89.5 + seed.random() * 0.2}}}]
+    }
+
+
+@app.get("/zoning/{city}")
+async def zoning(city: str, lat: float = 0.0, lng: float = 0.0):
+    failure = await simulate("zoning")
+    if failure:
+        return failure
+    return {"zoning_district": random.Random(f"{city}:{lat:.4f}:{lng:.4f}").choice(["SR-C1", "SR-C2", "TR-C1", "RS6"])}
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-ins for the OpenAI, geocoding and municipal zoning APIs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of OpenAI requests answered with a 429")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="multiplier applied to every median latency")
+    parser.add_argument(
+        "--profile", action="append", default=[], metavar="GROUP:FIELD=VALUE",
+        help="override one profile field, e.g. chat:median_ms=800 or zoning:error_rate=0.2"
+    )
+    args = parser.parse_args()
+
+    for group, profile in PROFILES.items():
+        profile["median_ms"] *= args.latency_scale
+        profile["error_rate"] = args.error_rate
+        if group in ("chat", "stream", "images"):
+            profile["rate_limit_rate"] = args.rate_limit_rate
+    for override in args.profile:
+        target, value = override.split("=", 1)
+        group, field = target.split(":", 1)
+        PROFILES[group][field] = float(value)
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
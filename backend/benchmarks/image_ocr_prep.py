@@ -0,0 +1,162 @@
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytesseract
+from PIL import Image, ImageDraw
+
+from ocr_modes import WORDS, load_font, word_accuracy
+from utils.image_preprocess import PAGE_LONG_EDGE_INCHES, load_page_image
+from utils.ocr_pool import OCR_IMAGE_DPI, tesseract_page
+
+# Pixel data is stored so that applying the EXIF orientation shows the page upright,
+# the way phones save photos taken sideways.
+ORIENTATIONS = {1: None, 6: Image.Transpose.ROTATE_90, 8: Image.Transpose.ROTATE_270}
+
+
+# A portrait page photographed upright; width and height are for the upright frame.
+def photographed_form(rng: random.Random, width: int, height: int):
+    photo = np.empty((height, width), dtype=np.float32)
+    # A desk lit from one side.
+    photo[:] = np.linspace(60, 110, width, dtype=np.float32)[None, :]
+
+    page_height = int(height * rng.uniform(0.75, 0.85))
+    page_width = int(page_height * 8.5 / 11)
+    page = Image.new("L", (page_width, page_height), 238)
+    draw = ImageDraw.Draw(page)
+    font = load_font(page_height // 70)
+    lines = ["BUILDING PERMIT APPLICATION"]
+    y = page_height // 12
+    draw.text((page_width // 10, y), lines[0], font=font, fill=20)
+    while y < page_height * 0.88:
+        y += page_height // 40
+        line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 7)))
+        draw.text((page_width // 10, y), line, font=font, fill=25)
+        lines.append(line)
+
+    page = page.rotate(rng.uniform(-2.5, 2.5), resample=Image.BILINEAR, expand=True, fillcolor=0)
+    mask = page.point(lambda value: 255 if value else 0)
+    left, top = (width - page.width) // 2, (height - page.height) // 2
+    canvas = Image.fromarray(photo.astype(np.uint8))
+    canvas.paste(page, (left, top), mask)
+
+    pixels = np.asarray(canvas, dtype=np.float32) * np.linspace(0.85, 1.05, height, dtype=np.float32)[:, None]
+    pixels += np.random.default_rng(rng.randrange(1 << 30)).normal(0, 6, pixels.shape).astype(np.float32)
+    gray = Image.fromarray(pixels.clip(0, 255).astype(np.uint8))
+    # Phone photos are color; tint so the RGB decode path does real work.
+    return Image.merge("RGB", (gray, gray.point(lambda value: value * 0.97), gray.point(lambda value: value * 0.92))), "\n".join(lines)
+
+
+def write_corpus(directory: str, photos: int, width: int, height: int):
+    rng = random.Random(9)
+    corpus = []
+    for number in range(photos):
+        image, truth = photographed_form(rng, min(width, height), max(width, height))
+        orientation = rng.choice(list(ORIENTATIONS))
+        if ORIENTATIONS[orientation] is not None:
+            image = image.transpose(ORIENTATIONS[orientation])
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        path = os.path.join(directory, f"form_{number:02d}.jpg")
+        image.save(path, quality=90, exif=exif)
+        corpus.append((path, truth))
+    return corpus
+
+
+def baseline(path: str, dpi: int) -> Image.Image:
+    image = Image.open(path)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.load()
+    return image
+
+
+PIPELINES = {
+    # The old path: the decoded photo goes to pytesseract as is.
+    "baseline": (baseline, "--psm 6"),
+    # Returns None when the photo goes to tesseract as uploaded.
+    "normalized": (lambda path, dpi: load_page_image(path, dpi), "--psm 6 --dpi {dpi}"),
+    "binary": (lambda path, dpi: load_page_image(path, dpi, binarize_page=True), "--psm 6 --dpi {dpi}"),
+}
+
+
+def measure(name: str, corpus, dpi: int, ocr: bool, results):
+    prepare, config = PIPELINES[name]
+    prep_seconds, ocr_seconds, scores, megapixels = [], [], [], []
+    for path, truth in corpus:
+        start = time.perf_counter()
+        image = prepare(path, dpi)
+        prep_seconds.append(time.perf_counter() - start)
+        if image is None:
+            with Image.open(path) as uploaded:
+                megapixels.append(uploaded.width * uploaded.height / 1e6)
+        else:
+            megapixels.append(image.width * image.height / 1e6)
+        if ocr:
+            start = time.perf_counter()
+            if name == "baseline":
+                text = pytesseract.image_to_string(image, config=config)
+            elif image is None:
+                text = pytesseract.image_to_string(path, config="--psm 6")
+            else:
+                text = tesseract_page(image, config.format(dpi=round(max(image.size) / PAGE_LONG_EDGE_INCHES)), 3600)
+            ocr_seconds.append(time.perf_counter() - start)
+            scores.append(word_accuracy(truth, text))
+        del image
+    results.put((prep_seconds, ocr_seconds, scores, statistics.mean(megapixels), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+def run_isolated(name: str, corpus, dpi: int, ocr: bool):
+    # A fresh process per pipeline so peak RSS reflects only that pipeline.
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=measure, args=(name, corpus, dpi, ocr, results))
+    process.start()
+    outcome = results.get()
+    process.join()
+    return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure image upload preprocessing and OCR before and after normalization.")
+    parser.add_argument("--photos", type=int, default=8)
+    parser.add_argument("--width", type=int, default=4032, help="photo width in pixels (4032x3024 is a 12 MP phone camera)")
+    parser.add_argument("--height", type=int, default=3024)
+    parser.add_argument("--dpi", type=int, default=OCR_IMAGE_DPI)
+    parser.add_argument("--ocr", action="store_true", help="also run tesseract and report accuracy (needs the tesseract binary)")
+    parser.add_argument("--pipelines", nargs="+", default=list(PIPELINES), choices=PIPELINES)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="image-ocr-bench-")
+    try:
+        # Generated in a child process: Linux keeps the peak RSS across exec, so a large
+        # parent would leak into every measurement below.
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            corpus = pool.apply(write_corpus, (workdir, args.photos, args.width, args.height))
+        print(f"{args.photos} photographed forms at {args.width}x{args.height}, normalized to {args.dpi} dpi\n")
+
+        header = f"{'pipeline':<12}{'prep ms':>9}{'MP to OCR':>11}{'photos/s':>10}{'peak RSS MB':>13}"
+        print(header + (f"{'ocr s':>8}{'accuracy':>10}" if args.ocr else ""))
+        for name in args.pipelines:
+            prep_seconds, ocr_seconds, scores, megapixels, peak_kb = run_isolated(name, corpus, args.dpi, args.ocr)
+            total = sum(prep_seconds) + sum(ocr_seconds)
+            line = f"{name:<12}{statistics.median(prep_seconds) * 1000:>9.0f}{megapixels:>11.1f}{len(corpus) / total:>10.2f}{peak_kb / 1024:>13.0f}"
+            if args.ocr:
+                line += f"{statistics.mean(ocr_seconds):>8.2f}{statistics.mean(scores):>9.1%}"
+            print(line)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STRUCTURES = ["garage", "shed", "deck", "fence", "addition"]
+STREETS = ["Main St", "University Ave", "Johnson St", "Atwood Ave", "Wisconsin Ave", "Capitol Dr"]
+CITIES = ["Madison, WI", "Milwaukee, WI"]
+
+DEFAULT_MIX = {
+    "root": 2,
+    "health": 5,
+    "metrics": 3,
+    "feasibility": 30,
+    "feasibility_batch": 3,
+    "narrative": 10,
+    "narrative_stream": 10,
+    "review": 5,
+    "visual": 5,
+    "export": 10,
+    "permit_package": 3,
+}
+
+
+def random_project() -> Dict[str, Any]:
+    structure = random.choice(STRUCTURES)
+    length, width = random.randint(8, 40), random.randint(8, 30)
+    return {
+        "description": f"Build a {length}x{width} {structure} in the back yard (request {random.getrandbits(32):08x})",
+        "address": f"{random.randint(100, 9999)} {random.choice(STREETS)}, {random.choice(CITIES)}",
+        "structure_type": structure,
+        "dimensions": {"length": length, "width": width, "height": random.randint(8, 18)},
+        "location_on_lot": random.choice(["rear yard", "side yard", "behind the house"]),
+        "property_type": "residential",
+        "materials": {"exterior": "vinyl siding", "roofing": "asphalt shingle", "foundation": "concrete slab"}
+    }
+
+
+def sample_permit_pdf(pages: int = 6) -> bytes:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=letter)
+    for page in range(1, pages + 1):
+        y = 720
+        pdf.drawString(72, y, f"SECTION {page}. SITE PLAN AND CONSTRUCTION DETAILS")
+        for line in range(40):
+            y -= 16
+            pdf.drawString(72, y, f"Line {line}: detached garage 24 x 30 ft, rear setback 5 ft, side setback 3 ft, height 15 ft.")
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+class Sample:
+    def __init__(self, scenario: str, ok: bool, status: int, latency: float, ttfb: Optional[float], error: Optional[str] = None):
+        self.scenario = scenario
+        self.ok = ok
+        self.status = status
+        self.latency = latency
+        self.ttfb = ttfb
+        self.error = error
+
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, bypass_cache: bool, review_pdf: bytes):
+        self.client = client
+        self.params = {"bypass_cache": "true"} if bypass_cache else {}
+        self.review_pdf = review_pdf
+        self.scenarios: Dict[str, Callable[[], Awaitable[Tuple[int, Optional[float], bytes]]]] = {
+            "root": lambda: self._request("GET", "/"),
+            "health": lambda: self._request("GET", "/api/health"),
+            "metrics": lambda: self._request("GET", "/api/metrics"),
+            "feasibility": lambda: self._request("POST", "/api/feasibility-check", json=random_project(), params=self.params),
+            "feasibility_batch": self._feasibility_batch,
+            "narrative": lambda: self._request("POST", "/api/generate-narrative", json=random_project(), params=self.params),
+            "narrative_stream": lambda: self._request(
+                "POST", "/api/generate-narrative/stream", json=random_project(), params=self.params
+            ),
+            "review": lambda: self._request(
+                "POST", "/api/review-permit", params=self.params,
+                files={"document": ("permit.pdf", self.review_pdf, "application/pdf")},
+                data={"project_data": json.dumps(random_project())}
+            ),
+            "visual": self._visual,
+            "export": self._export,
+            "permit_package": self._permit_package,
+        }
+
+    async def _request(self, method: str, path: str, **kwargs) -> Tuple[int, Optional[float], bytes]:
+        start = time.perf_counter()
+        ttfb = None
+        body = bytearray()
+        async with self.client.stream(method, path, **kwargs) as response:
+            async for chunk in response.aiter_bytes():
+                if ttfb is None:
+                    ttfb = time.perf_counter() - start
+                body.extend(chunk)
+        return response.status_code, ttfb, bytes(body)
+
+    async def _feasibility_batch(self):
+        # The last project gives its sizes without units; the rule engine must leave it to the LLM.
+        unitless = random_project()
+        unitless["dimensions"] = {"length": "24", "width": "20", "height": "2 stories"}
+        unitless["location_on_lot"] = "5 feet from the rear of the house"
+        projects = [random_project() for _ in range(9)] + [unitless]
+
+        status, ttfb, body = await self._request("POST", "/api/feasibility-check/batch", json={"projects": projects})
+        if status != 200:
+            return status, ttfb, body
+
+        lines = [json.loads(line) for line in body.decode().splitlines() if line.strip()]
+        deferred = [line for line in lines if line["index"] == len(projects) - 1]
+        if len(lines) != len(projects) or not deferred or deferred[0].get("result", {}).get("decided_by") == "rules":
+            return 502, ttfb, body
+        return status, ttfb, body
+
+    async def _visual(self):
+        project = random_project()
+        return await self._request("POST", "/api/generate-visual", json={
+            "structure_type": project["structure_type"],
+            "dimensions": project["dimensions"],
+            "materials": project["materials"],
+            "visual_type": random.choice(["3d_rendering", "site_plan", "elevation", "floor_plan"])
+        })
+
+    async def _export(self):
+        return await self._request("POST", "/api/export-document", json={
+            "type": random.choice(["pdf", "docx", "checklist"]),
+            "project_data": random_project(),
+            "feasibility_results": {"verdict": "Feasible", "confidence_score": 80, "compliance_summary": "Meets limits"},
+            "narrative_results": {"narrative": "Slab on grade, wood framed walls, asphalt shingle roof. " * 40},
+            "review_results": {"rejection_risk": "Low", "fixes": [{"description": "Label setbacks", "priority": "High"}]}
+        })
+
+    async def _permit_package(self):
+        status, ttfb, body = await self._request(
+            "POST", "/api/permit-package", json={"project": random_project(), "bypass_cache": bool(self.params)}
+        )
+        if status != 200:
+            return status, ttfb, body
+
+        final = json.loads(body.decode().strip().split("\n\n")[-1].split("data: ", 1)[1])
+        if not final.get("download_url"):
+            return 502, ttfb, body
+        download_status, _, document = await self._request("GET", final["download_url"])
+        return download_status, ttfb, document
+
+    async def run_one(self, scenario: str) -> Sample:
+        start = time.perf_counter()
+        try:
+            status, ttfb, _ = await self.scenarios[scenario]()
+            return Sample(scenario, status < 400, status, time.perf_counter() - start, ttfb)
+        except Exception as e:
+            return Sample(scenario, False, 0, time.perf_counter() - start, None, f"{type(e).__name__}: {e}")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def report(samples: List[Sample], elapsed: float, dropped: int):
+    header = f"{'endpoint':<20}{'count':>7}{'rps':>8}{'err%':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'ttfb p50':>10}"
+    print(header)
+    print("-" * len(header))
+
+    by_scenario: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        by_scenario.setdefault(sample.scenario, []).append(sample)
+
+    for scenario, group in sorted(by_scenario.items(), key=lambda item: -len(item[1])) + [("TOTAL", samples)]:
+        latencies = [sample.latency * 1000 for sample in group if sample.ok]
+        ttfbs = [sample.ttfb * 1000 for sample in group if sample.ok and sample.ttfb is not None]
+        errors = sum(1 for sample in group if not sample.ok)
+        print(
+            f"{scenario:<20}{len(group):>7}{len(group) / elapsed:>8.2f}{errors * 100 / len(group):>7.1f}"
+            f"{percentile(latencies, 0.5):>9.0f}{percentile(latencies, 0.95):>9.0f}{percentile(latencies, 0.99):>9.0f}"
+            f"{percentile(ttfbs, 0.5):>10.0f}"
+        )
+
+    failures: Dict[str, int] = {}
+    for sample in samples:
+        if not sample.ok:
+            reason = f"{sample.scenario}: {sample.error or f'HTTP {sample.status}'}"
+            failures[reason] = failures.get(reason, 0) + 1
+    if failures:
+        print("\nerrors:")
+        for reason, count in sorted(failures.items(), key=lambda item: -item[1])[:15]:
+            print(f"  {count:>5}  {reason[:140]}")
+    if dropped:
+        print(f"\n{dropped} arrivals dropped because --max-in-flight was reached")
+
+
+async def drive(args, mix: Dict[str, float]):
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    timeout = httpx.Timeout(args.timeout, connect=5.0)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+        load_test = LoadTest(client, args.bypass_cache, sample_permit_pdf())
+        scenarios, weights = zip(*mix.items())
+
+        samples: List[Sample] = []
+        pending = set()
+        dropped = 0
+        start = time.perf_counter()
+        next_arrival = start
+
+        # Open-loop arrivals: requests are launched on a Poisson schedule regardless
+        # of how many are still outstanding, so a slow backend shows up as latency
+        # instead of silently lowering the offered rate.
+        while next_arrival - start < args.duration:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            if len(pending) >= args.max_in_flight:
+                dropped += 1
+            else:
+                task = asyncio.create_task(load_test.run_one(random.choices(scenarios, weights)[0]))
+                pending.add(task)
+                task.add_done_callback(lambda done: (pending.discard(done), samples.append(done.result())))
+            next_arrival += random.expovariate(args.rate)
+
+        if pending:
+            await asyncio.wait(pending)
+        elapsed = time.perf_counter() - start
+
+    print(f"offered rate {args.rate:.1f} req/s for {args.duration:.0f}s against {args.base_url}\n")
+    report(samples, elapsed, dropped)
+
+    try:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=10) as client:
+            metrics = (await client.get("/api/metrics")).json()
+        print("\nbackend metrics:")
+        print(json.dumps({key: metrics.get(key) for key in ("openai_scheduler", "coalescing", "llm_cache")}, indent=2))
+    except Exception as e:
+        print(f"\ncould not fetch backend metrics: {e}")
+
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode} before becoming ready")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+def launch_stack(args) -> List[subprocess.Popen]:
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    fake = subprocess.Popen(
+        [sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "fake_upstreams.py"), "--port", str(args.fake_port), *args.fake_arg],
+        cwd=BACKEND_DIR
+    )
+    wait_until_ready(f"{fake_url}/stats", fake)
+
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "load-test",
+        "OPENAI_BASE_URL": f"{fake_url}/v1",
+        "GOOGLE_MAPS_API_KEY": "load-test",
+        "GEOCODE_URL": f"{fake_url}/maps/api/geocode/json",
+        "MADISON_ZONING_URL": f"{fake_url}/zoning/madison_wi",
+        "MILWAUKEE_ZONING_URL": f"{fake_url}/zoning/milwaukee_wi",
+        "CACHE_DIR": tempfile.mkdtemp(prefix="permitcheck-load-"),
+        "OPENAI_RPM": os.environ.get("OPENAI_RPM", "100000"),
+        "OPENAI_TPM": os.environ.get("OPENAI_TPM", "100000000"),
+    }
+    backend_port = httpx.URL(args.base_url).port or 8000
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(backend_port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+    wait_until_ready(f"{args.base_url}/api/health", backend)
+    return [backend, fake]
+
+
+def parse_mix(overrides: List[str]) -> Dict[str, float]:
+    mix = dict(DEFAULT_MIX)
+    for override in overrides:
+        scenario, weight = override.split("=", 1)
+        if scenario not in mix:
+            raise SystemExit(f"unknown scenario {scenario!r}; choose from {', '.join(mix)}")
+        mix[scenario] = float(weight)
+    return {scenario: weight for scenario, weight in mix.items() if weight > 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive every API route at a target request rate and report latency percentiles.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rate", type=float, default=5.0, help="offered requests per second across all endpoints")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds to generate load for")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout in seconds")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--mix", action="append", default=[], metavar="SCENARIO=WEIGHT", help="override a scenario weight; 0 disables it")
+    parser.add_argument("--bypass-cache", action="store_true", help="send bypass_cache=true so every call reaches the upstream")
+    parser.add_argument("--launch", action="store_true", help="start fake upstreams and a backend wired to them")
+    parser.add_argument("--fake-port", type=int, default=8900)
+    parser.add_argument("--fake-arg", action="append", default=[], help="extra argument for fake_upstreams.py, e.g. --fake-arg=--error-rate=0.05")
+    args = parser.parse_args()
+
+    processes = launch_stack(args) if args.launch else []
+    try:
+        asyncio.run(drive(args, parse_mix(args.mix)))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import difflib
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from utils.image_preprocess import preprocess_scan
+from utils.ocr_pool import OCR_DPI, OCR_MODES, OCR_PAGE_TIMEOUT, ocr_pdf_page
+
+FONT_PATHS = ["/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/Library/Fonts/Arial.ttf", "C:\\Windows\\Fonts\\arial.ttf"]
+WORDS = (
+    "applicant owner parcel zoning district setback rear side front yard height accessory structure garage "
+    "shed deck fence footing slab framing trusses roof shingle survey plat permit inspection elevation "
+    "drawing scale feet inches square lot coverage impervious drainage easement utility electrical"
+).split()
+
+
+def load_font(size: int):
+    for path in FONT_PATHS:
+        if os.path.exists(path):
+            return ImageFont.truetype(path, size)
+    return ImageFont.load_default()
+
+
+def scanned_page(rng: random.Random, dpi: int, skew: float, noise: float):
+    width, height = int(8.5 * dpi), int(11 * dpi)
+    image = Image.new("L", (width, height), 245)
+    draw = ImageDraw.Draw(image)
+    font = load_font(dpi // 7)
+
+    lines = []
+    y = dpi
+    while y < height - dpi:
+        line = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 9)))
+        draw.text((dpi, y), line, font=font, fill=25)
+        lines.append(line)
+        y += dpi // 4
+
+    image = image.rotate(skew, resample=Image.BILINEAR, fillcolor=245)
+    pixels = np.asarray(image, dtype=np.float32) + np.random.default_rng(rng.randrange(1 << 30)).normal(0, noise, (height, width))
+    return Image.fromarray(pixels.clip(0, 255).astype(np.uint8)), "\n".join(lines)
+
+
+# Scanners and "print to PDF" tools often tile a page into several image strips,
+# which is what makes the per-image path render and OCR repeatedly.
+def write_scanned_pdf(path: str, pages: int, strips: int, dpi: int, max_skew: float, noise: float):
+    rng = random.Random(5)
+    truths = []
+    pdf = canvas.Canvas(path, pagesize=letter)
+    page_width, page_height = letter
+    for _ in range(pages):
+        image, truth = scanned_page(rng, dpi, rng.uniform(-max_skew, max_skew), noise)
+        truths.append(truth)
+        strip_height = image.height // strips
+        for strip in range(strips):
+            top = strip * strip_height
+            bottom = image.height if strip == strips - 1 else top + strip_height
+            tile = image.crop((0, top, image.width, bottom))
+            pdf.drawImage(
+                ImageReader(tile), 0, page_height * (1 - bottom / image.height),
+                width=page_width, height=page_height * (bottom - top) / image.height
+            )
+        pdf.showPage()
+    pdf.save()
+    return truths
+
+
+def word_accuracy(truth: str, text: str) -> float:
+    return difflib.SequenceMatcher(None, truth.lower().split(), text.lower().split(), autojunk=False).ratio()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-image OCR against rasterize-once page OCR on synthetic scans.")
+    parser.add_argument("--pages", type=int, default=4)
+    parser.add_argument("--strips", type=int, default=6, help="embedded images per scanned page")
+    parser.add_argument("--scan-dpi", type=int, default=200)
+    parser.add_argument("--dpi", type=int, default=OCR_DPI, help="rasterization DPI for the page mode")
+    parser.add_argument("--max-skew", type=float, default=3.0, help="degrees of random skew applied to each page")
+    parser.add_argument("--noise", type=float, default=18.0, help="standard deviation of gaussian scanner noise")
+    parser.add_argument("--modes", nargs="+", default=list(OCR_MODES), choices=OCR_MODES)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="ocr-bench-"), "scanned.pdf")
+    truths = write_scanned_pdf(path, args.pages, args.strips, args.scan_dpi, args.max_skew, args.noise)
+    print(f"{args.pages} pages, {args.strips} images per page, skew up to {args.max_skew} deg, noise {args.noise}")
+
+    preprocess_ms = []
+    for page in range(args.pages):
+        image, _ = scanned_page(random.Random(page), args.dpi, args.max_skew, args.noise)
+        start = time.perf_counter()
+        preprocess_scan(image)
+        preprocess_ms.append((time.perf_counter() - start) * 1000)
+    print(f"preprocess at {args.dpi} dpi: {statistics.median(preprocess_ms):.0f} ms per page (grayscale, Otsu, deskew)\n")
+
+    print(f"{'mode':<8}{'s/page':>10}{'accuracy':>11}{'worst':>9}")
+    for mode in args.modes:
+        seconds, scores = [], []
+        for page_index, truth in enumerate(truths):
+            start = time.perf_counter()
+            text = ocr_pdf_page(path, page_index, mode, args.dpi, OCR_PAGE_TIMEOUT)
+            seconds.append(time.perf_counter() - start)
+            scores.append(word_accuracy(truth, text))
+        print(f"{mode:<8}{statistics.mean(seconds):>10.2f}{statistics.mean(scores):>10.1%}{min(scores):>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
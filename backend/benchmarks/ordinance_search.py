@@ -0,0 +1,101 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.ordinance_index import OrdinanceIndex, ORDINANCE_TOP_K
+from utils.text_chunks import estimate_tokens
+
+DISTRICTS = ["SR-C1", "SR-C2", "SR-C3", "TR-C1", "TR-V1", "RS6", "RT4", "LB", "NMX", "CC-T", "IL", "A"]
+STRUCTURES = ["garage", "shed", "deck", "fence", "addition", "pool", "porch", "carport", "greenhouse", "gazebo"]
+TOPICS = [
+    "maximum height of accessory buildings measured from average grade",
+    "minimum side yard and rear yard setbacks for detached structures",
+    "lot coverage limits including impervious surface",
+    "permit submittal requirements including site plan and plat of survey",
+    "fence height in front yards and corner vision triangles",
+    "decks attached to the principal dwelling and footing depth",
+    "floodplain and shoreland overlay restrictions",
+    "conditional use approval and variance procedures",
+]
+
+
+def write_corpus(directory: str, files: int, sections_per_file: int):
+    rng = random.Random(7)
+    for file_number in range(files):
+        lines = []
+        for section in range(sections_per_file):
+            district = rng.choice(DISTRICTS)
+            structure = rng.choice(STRUCTURES)
+            topic = rng.choice(TOPICS)
+            lines.append(f"SECTION {file_number + 1}.{section:03d} {structure.upper()} STANDARDS IN THE {district} DISTRICT")
+            lines.append(
+                f"({rng.randint(1, 9)}) In the {district} district, a {structure} is subject to the {topic}. "
+                f"The {structure} shall not exceed {rng.randint(10, 25)} feet and shall be set back at least "
+                f"{rng.randint(3, 10)} feet from any lot line. " * rng.randint(2, 6)
+            )
+            lines.append("")
+        with open(os.path.join(directory, f"municipal_code_{file_number:02d}.txt"), "w") as f:
+            f.write("\n".join(lines))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure ordinance retrieval latency and prompt tokens saved.")
+    parser.add_argument("--data-dir", help="directory of ordinance .txt/.md files; a synthetic corpus is generated if omitted")
+    parser.add_argument("--files", type=int, default=12)
+    parser.add_argument("--sections-per-file", type=int, default=400)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=ORDINANCE_TOP_K)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ordinance-bench-")
+    data_dir = args.data_dir
+    if not data_dir:
+        data_dir = os.path.join(workdir, "ordinances")
+        os.makedirs(data_dir)
+        write_corpus(data_dir, args.files, args.sections_per_file)
+
+    start = time.perf_counter()
+    OrdinanceIndex(data_dir, os.path.join(workdir, "compiled")).ensure_loaded()
+    compile_s = time.perf_counter() - start
+
+    index = OrdinanceIndex(data_dir, os.path.join(workdir, "compiled"))
+    start = time.perf_counter()
+    index.ensure_loaded()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(11)
+    queries = [
+        f"{rng.choice(STRUCTURES)} {rng.choice(DISTRICTS)} residential rear yard setback height "
+        f"build a {rng.randint(10, 30)}x{rng.randint(10, 30)} detached {rng.choice(STRUCTURES)}"
+        for _ in range(args.queries)
+    ]
+
+    latencies, injected = [], []
+    for query in queries:
+        start = time.perf_counter()
+        context = index.prompt_context(query, args.top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        injected.append(estimate_tokens(context) if context else 0)
+
+    latencies.sort()
+    print(f"sections:          {len(index.sections)} ({len(index.terms)} terms)")
+    print(f"corpus tokens:     {index.corpus_tokens}")
+    print(f"compile:           {compile_s:.2f}s, warm load {load_ms:.1f} ms")
+    print(f"search p50:        {statistics.median(latencies):.3f} ms")
+    print(f"search p99:        {latencies[int(len(latencies) * 0.99) - 1]:.3f} ms")
+    print(f"injected tokens:   {statistics.mean(injected):.0f} per prompt (top {args.top_k})")
+    print(f"tokens saved:      {index.corpus_tokens - statistics.mean(injected):.0f} per prompt vs. the full corpus")
+    top = index.search(queries[0], 1)
+    if top:
+        print(f"\nexample query:     {queries[0]}")
+        print(f"best match:        [{top[0]['source']}] {top[0]['title']} (score {top[0]['score']})")
+
+
+if __name__ == "__main__":
+    main()
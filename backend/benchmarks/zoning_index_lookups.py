@@ -0,0 +1,85 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.zoning_index import ZoningDistrictIndex
+
+DISTRICTS = ["R-1", "R-2", "R-3", "C-1", "C-2", "I-1"]
+ORIGIN_LNG, ORIGIN_LAT = -89.60, 42.85
+CELL = 0.004
+
+
+def parcel_polygon(col: int, row: int, vertices: int):
+    cx = ORIGIN_LNG + (col + 0.5) * CELL
+    cy = ORIGIN_LAT + (row + 0.5) * CELL
+    ring = []
+    for k in range(vertices):
+        angle = 2 * math.pi * k / vertices
+        radius = CELL * 0.5 / max(abs(math.cos(angle)), abs(math.sin(angle)))
+        ring.append([cx + radius * math.cos(angle), cy + radius * math.sin(angle)])
+    ring.append(ring[0])
+    return [ring]
+
+
+def write_county(path: str, side: int, vertices: int):
+    features = []
+    for col in range(side):
+        for row in range(side):
+            features.append({
+                "type": "Feature",
+                "properties": {"zoning_district": DISTRICTS[(col * 7 + row) % len(DISTRICTS)]},
+                "geometry": {"type": "Polygon", "coordinates": parcel_polygon(col, row, vertices)}
+            })
+    with open(path, "w") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f)
+
+
+def main(side: int, vertices: int, lookups: int):
+    workdir = tempfile.mkdtemp()
+    data_dir = os.path.join(workdir, "zoning")
+    os.makedirs(data_dir)
+    write_county(os.path.join(data_dir, "county.geojson"), side, vertices)
+
+    start = time.perf_counter()
+    ZoningDistrictIndex(data_dir, os.path.join(workdir, "cache")).ensure_loaded()
+    compile_seconds = time.perf_counter() - start
+
+    index = ZoningDistrictIndex(data_dir, os.path.join(workdir, "cache"))
+    start = time.perf_counter()
+    index.ensure_loaded()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(7)
+    points = []
+    for _ in range(lookups):
+        col, row = rng.randrange(side), rng.randrange(side)
+        lng = ORIGIN_LNG + (col + rng.uniform(0.2, 0.8)) * CELL
+        lat = ORIGIN_LAT + (row + rng.uniform(0.2, 0.8)) * CELL
+        points.append((lat, lng, DISTRICTS[(col * 7 + row) % len(DISTRICTS)]))
+
+    start = time.perf_counter()
+    mismatches = sum(index.lookup(lat, lng) != expected for lat, lng, expected in points)
+    elapsed = time.perf_counter() - start
+
+    print(f"polygons:          {side * side} x {vertices} vertices")
+    print(f"compile:           {compile_seconds:.2f}s (one-off, cached on disk)")
+    print(f"warm load (mmap):  {load_ms:.2f} ms")
+    print(f"lookups/sec:       {lookups / elapsed:,.0f}")
+    print(f"mean lookup:       {elapsed / lookups * 1e6:.1f} us")
+    print(f"mismatches:        {mismatches}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Point-in-polygon zoning lookups on a synthetic county")
+    parser.add_argument("--side", type=int, default=250, help="polygons per side of the synthetic county grid")
+    parser.add_argument("--vertices", type=int, default=24)
+    parser.add_argument("--lookups", type=int, default=50000)
+    args = parser.parse_args()
+    main(args.side, args.vertices, args.lookups)
@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.zoning_service import ZoningService
+from utils.cache import TieredCache
+from utils.http_client import HTTPClient
+
+
+def slow_upstream(delay: float) -> httpx.MockTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delay)
+        if "geocode" in request.url.path:
+            return httpx.Response(200, json={
+                "status": "OK",
+                "results": [{"geometry": {"location": {"lat": 43.07, "lng": -89.40}}}]
+            })
+        return httpx.Response(200, json={"zoning_district": "R-1"})
+
+    return httpx.MockTransport(handler)
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval: float, samples: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def run(concurrency: int, delay: float, interval: float):
+    os.environ.setdefault("GOOGLE_MAPS_API_KEY", "load-test")
+    # A throwaway cache so every run goes to the slow upstream instead of reusing the last one.
+    workdir = tempfile.mkdtemp(prefix="zoning-loop-bench-")
+    service = ZoningService(
+        http_client=HTTPClient(transport=slow_upstream(delay), max_per_host=concurrency),
+        cache=TieredCache(os.path.join(workdir, "zoning.sqlite3"))
+    )
+    service.google_maps_api_key = os.environ["GOOGLE_MAPS_API_KEY"]
+
+    samples = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_loop_lag(stop, interval, samples))
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            service.get_zoning_info(f"{i} Main St, Madison, WI", None) for i in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+    finally:
+        stop.set()
+        await ticker
+        await service.http_client.close()
+        service.cache.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    samples.sort()
+    print(f"lookups:           {concurrency} (upstream delay {delay:.2f}s)")
+    print(f"wall clock:        {elapsed:.2f}s")
+    print(f"loop lag p50:      {statistics.median(samples):.2f} ms")
+    print(f"loop lag p99:      {samples[int(len(samples) * 0.99) - 1]:.2f} ms")
+    print(f"loop lag max:      {samples[-1]:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Event-loop latency while zoning upstreams are slow")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--delay", type=float, default=2.0)
+    parser.add_argument("--interval", type=float, default=0.01)
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency, args.delay, args.interval))
@@ -1,24 +1,34 @@
 from dotenv import load_dotenv
+import logging
 import os
 
 load_dotenv()
 
-print(f"OpenAI API Key loaded: {os.getenv('OPENAI_API_KEY') is not None}")  # Debug line
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
 
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+if not os.getenv("OPENAI_API_KEY"):
+    logger.warning("OPENAI_API_KEY is not set; AI endpoints will fail")
+
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
+from starlette.background import BackgroundTask
 import uvicorn
+import openai
 import tempfile
 from typing import Optional, List, Dict, Any
 import json
+from datetime import datetime, timezone
 
 from services.ai_service import AIService
-from services.document_service import DocumentService
+from services.document_service import DocumentService, UnreadableDocumentError
 from services.export_service import ExportService
 from services.zoning_service import ZoningService
-from models.project import ProjectData, FeasibilityResults, ReviewResults, VisualRequest
-from utils.file_utils import validate_file, save_uploaded_file
+from services.pipeline_service import PermitPackagePipeline
+from models.project import ProjectData, FeasibilityResults, ReviewResults, DocumentChanges, VisualRequest, BatchFeasibilityRequest, PermitPackageRequest
+from utils.file_utils import validate_file, save_uploaded_file, MAX_FILE_SIZE
+from utils.http_client import close_http_client
 
 app = FastAPI(title="PermitCheck AI API", version="1.0.0")
 
@@ -30,65 +40,175 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+UPLOAD_PATHS = {"/api/review-permit"}
+MULTIPART_OVERHEAD = 64 * 1024
+
+BATCH_ZONING_CONCURRENCY = int(os.getenv("BATCH_ZONING_CONCURRENCY", "8"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+
 ai_service = AIService()
 document_service = DocumentService()
 export_service = ExportService()
 zoning_service = ZoningService()
+pipeline = PermitPackagePipeline(ai_service, zoning_service, export_service)
+
+EXPORT_MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "checklist": "application/pdf"
+}
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    content_length = request.headers.get("content-length")
+    if (
+        request.method == "POST" and request.url.path in UPLOAD_PATHS and
+        content_length and content_length.isdigit() and int(content_length) > MAX_FILE_SIZE + MULTIPART_OVERHEAD
+    ):
+        return JSONResponse(status_code=413, content={"detail": f"File exceeds the {MAX_FILE_SIZE // (1024 * 1024)} MB upload limit"})
+    return await call_next(request)
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_http_client()
+    zoning_service.cache.close()
+    ai_service.response_cache.close()
+    ai_service.image_store.close()
+    document_service.ocr_pool.close()
+    document_service.page_cache.close()
+
+def utc_timestamp() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+
+def upstream_error_status(error: Exception) -> int:
+    if isinstance(error, openai.RateLimitError):
+        return 429
+    if isinstance(error, openai.APITimeoutError):
+        return 504
+    if isinstance(error, (openai.APIConnectionError, openai.APIStatusError)):
+        return 502
+    return 500
+
+def remove_file(file_path: str):
+    if os.path.exists(file_path):
+        os.unlink(file_path)
+
+def document_response(file_path: str, export_type: str) -> FileResponse:
+    return FileResponse(
+        path=file_path,
+        media_type=EXPORT_MEDIA_TYPES[export_type],
+        filename=f"permit-package.{export_type}",
+        background=BackgroundTask(remove_file, file_path)
+    )
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 @app.get("/")
 async def root():
     return {"message": "PermitCheck AI API is running"}
 
 @app.post("/api/feasibility-check")
-async def check_feasibility(project_data: ProjectData) -> FeasibilityResults:
+async def check_feasibility(project_data: ProjectData, bypass_cache: bool = False) -> FeasibilityResults:
     try:
         zoning_info = await zoning_service.get_zoning_info(
             project_data.address, project_data.parcel_id
         )
         
         feasibility_result = await ai_service.analyze_feasibility(
-            project_data, zoning_info
+            project_data, zoning_info, bypass_cache=bypass_cache
         )
         
         return feasibility_result
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Feasibility check failed: {str(e)}")
+        raise HTTPException(status_code=upstream_error_status(e), detail=f"Feasibility check failed: {str(e)}")
+
+@app.post("/api/feasibility-check/batch")
+async def check_feasibility_batch(batch_request: BatchFeasibilityRequest):
+    projects = batch_request.projects
+    
+    async def stream_results():
+        # Each project is analyzed as soon as its own zoning lookup finishes.
+        zoning_groups = zoning_service.iter_zoning_info_many(
+            [(project.address, project.parcel_id) for project in projects],
+            max_concurrency=BATCH_ZONING_CONCURRENCY
+        )
+        
+        async for index, result in ai_service.analyze_feasibility_batch(
+            projects, zoning_groups, max_concurrency=BATCH_LLM_CONCURRENCY
+        ):
+            if isinstance(result, Exception):
+                line = {"index": index, "error": f"Feasibility check failed: {str(result)}"}
+            else:
+                line = {"index": index, "result": result.model_dump()}
+            yield json.dumps(line) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
 
 @app.post("/api/generate-narrative")
-async def generate_narrative(project_data: ProjectData):
+async def generate_narrative(project_data: ProjectData, bypass_cache: bool = False):
     try:
-        narrative = await ai_service.generate_construction_narrative(project_data)
+        narrative = await ai_service.generate_construction_narrative(project_data, bypass_cache=bypass_cache)
         
         return {
             "narrative": narrative,
             "word_count": len(narrative.split()),
-            "generated_at": "2024-01-01T00:00:00Z"
+            "generated_at": utc_timestamp()
         }
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Narrative generation failed: {str(e)}")
+        raise HTTPException(status_code=upstream_error_status(e), detail=f"Narrative generation failed: {str(e)}")
+
+@app.post("/api/generate-narrative/stream")
+async def stream_narrative(project_data: ProjectData, bypass_cache: bool = False):
+    async def event_stream():
+        parts = []
+        try:
+            async for text in ai_service.stream_construction_narrative(project_data, bypass_cache=bypass_cache):
+                parts.append(text)
+                yield sse_event("token", {"text": text})
+            
+            narrative = "".join(parts)
+            yield sse_event("done", {
+                "word_count": len(narrative.split()),
+                "generated_at": utc_timestamp()
+            })
+        
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Narrative generation failed: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.post("/api/review-permit")
 async def review_permit(
     document: UploadFile = File(...),
-    project_data: str = Form(...)
+    project_data: str = Form(...),
+    document_key: Optional[str] = Form(None),
+    bypass_cache: bool = False
 ):
     try:
         project_info = json.loads(project_data)
         
         if not validate_file(document):
-            raise HTTPException(status_code=400, detail="Invalid file type or size")
+            raise HTTPException(status_code=400, detail="Invalid file")
         
-        temp_file_path = await save_uploaded_file(document)
+        upload = await save_uploaded_file(document)
+        temp_file_path = upload.path
         
         try:
-            extracted_text = document_service.extract_text(temp_file_path)
-            
-            review_result = await ai_service.review_permit_application(
-                extracted_text, project_info
-            )
+            # Pages stream into the reviewer as they are extracted; unchanged pages are reused
+            # from the page cache. Change reports need an explicit document_key from the client:
+            # a filename alone would match unrelated uploads that share it.
+            extraction = document_service.open_document(temp_file_path, document_key, upload.sha256)
+            review_result = await ai_service.review_permit_pages(extraction, project_info, bypass_cache=bypass_cache)
             
+            if extraction.changes:
+                review_result = review_result.model_copy(update={"document_changes": DocumentChanges(**extraction.changes)})
             return review_result
         
         finally:
@@ -97,8 +217,12 @@ async def review_permit(
     
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid project data format")
+    except HTTPException:
+        raise
+    except UnreadableDocumentError as e:
+        raise HTTPException(status_code=422, detail=f"Unreadable document: {str(e)}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Document review failed: {str(e)}")
+        raise HTTPException(status_code=upstream_error_status(e), detail=f"Document review failed: {str(e)}")
 
 @app.post("/api/generate-visual")
 async def generate_visual(visual_request: VisualRequest):
@@ -109,34 +233,76 @@ async def generate_visual(visual_request: VisualRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Visual generation failed: {str(e)}")
 
+@app.get("/api/visuals/{image_id}/{variant}")
+async def get_visual(image_id: str, variant: str):
+    stored = ai_service.image_store.path(image_id, variant)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Visual not found")
+    
+    file_path, media_type = stored
+    return FileResponse(
+        path=file_path,
+        media_type=media_type,
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
+
 @app.post("/api/export-document")
 async def export_document(export_data: Dict[str, Any]):
     try:
         export_type = export_data.get("type", "pdf")
         
-        if export_type not in ["pdf", "docx", "checklist"]:
+        if export_type not in EXPORT_MEDIA_TYPES:
             raise HTTPException(status_code=400, detail="Invalid export type")
         
         file_path = export_service.create_document(export_data, export_type)
         
-        media_type = {
-            "pdf": "application/pdf",
-            "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            "checklist": "application/pdf"
-        }[export_type]
-        
-        filename = f"permit-package.{export_type}"
-        
-        return FileResponse(
-            path=file_path,
-            media_type=media_type,
-            filename=filename,
-            background=lambda: os.unlink(file_path) if os.path.exists(file_path) else None
-        )
+        return document_response(file_path, export_type)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Document export failed: {str(e)}")
 
+@app.post("/api/permit-package")
+async def build_permit_package(package_request: PermitPackageRequest):
+    async def event_stream():
+        async for event in pipeline.run(package_request):
+            yield sse_event(event["stage"] if event["stage"] == "pipeline" else "stage", event)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/permit-package/{package_id}")
+async def download_permit_package(package_id: str):
+    package = pipeline.claim_package(package_id)
+    if package is None:
+        raise HTTPException(status_code=404, detail="Permit package not found or expired")
+    
+    file_path, export_type = package
+    return document_response(file_path, export_type)
+
+@app.get("/api/metrics")
+async def metrics():
+    return {
+        "zoning_cache": zoning_service.get_cache_stats(),
+        "zoning_endpoints": zoning_service.get_endpoint_stats(),
+        "zoning_index": zoning_service.district_index.get_stats(),
+        "parcel_index": zoning_service.parcel_index.get_stats(),
+        "llm_cache": ai_service.response_cache.get_stats(),
+        "openai_scheduler": ai_service.scheduler.get_stats(),
+        "image_store": ai_service.image_store.get_stats(),
+        "ordinance_index": ai_service.ordinance_index.get_stats(),
+        "ocr_pool": document_service.ocr_pool.get_stats(),
+        "page_cache": document_service.page_cache.get_stats(),
+        "coalescing": {
+            "ai": ai_service.single_flight.get_stats(),
+            "zoning": zoning_service.single_flight.get_stats()
+        }
+    }
+
 @app.get("/api/health")
 async def health_check():
     return {
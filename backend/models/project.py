@@ -21,11 +21,20 @@ class ProjectData(BaseModel):
     property_type: str = Field(default="residential", description="Property classification")
     materials: Materials = Field(default_factory=Materials)
 
+class BatchFeasibilityRequest(BaseModel):
+    projects: List[ProjectData] = Field(..., min_length=1, max_length=1000)
+
 class ZoningInfo(BaseModel):
     district: str
     classification: str
     restrictions: List[str] = Field(default_factory=list)
 
+class RuleCheck(BaseModel):
+    rule: str
+    status: str = Field(..., description="pass, fail, or unknown")
+    detail: str
+    remedy: Optional[str] = None
+
 class FeasibilityResults(BaseModel):
     verdict: str = Field(..., description="Feasible, Needs Variance, or Not Feasible")
     confidence_score: Optional[int] = Field(None, ge=0, le=100)
@@ -34,6 +43,8 @@ class FeasibilityResults(BaseModel):
     issues: List[str] = Field(default_factory=list)
     recommendations: List[str] = Field(default_factory=list)
     required_permits: List[str] = Field(default_factory=list)
+    rule_checks: List[RuleCheck] = Field(default_factory=list)
+    decided_by: Optional[str] = Field(None, description="rules or llm")
 
 class ReviewIssue(BaseModel):
     category: Optional[str] = None
@@ -45,6 +56,30 @@ class ReviewFix(BaseModel):
     description: str
     priority: Optional[str] = None
 
+class DocumentChanges(BaseModel):
+    previous_sha256: str
+    previous_page_count: int
+    page_count: int
+    changed_pages: List[int] = Field(default_factory=list)
+    removed_pages: List[int] = Field(default_factory=list)
+    unchanged_pages: int = 0
+
+class PrescreenFinding(BaseModel):
+    page: int
+    offset: int
+    text: str
+
+class PrescreenResults(BaseModel):
+    has_signature_section: bool = False
+    has_date_fields: bool = False
+    has_contact_info: bool = False
+    has_project_description: bool = False
+    has_dimensions: bool = False
+    word_count: int = 0
+    issues: List[str] = Field(default_factory=list)
+    findings: Dict[str, List[PrescreenFinding]] = Field(default_factory=dict)
+    llm_review_skipped: bool = False
+
 class ReviewResults(BaseModel):
     rejection_risk: str = Field(..., description="Low, Medium, or High")
     confidence_score: Optional[int] = Field(None, ge=0, le=100)
@@ -54,6 +89,8 @@ class ReviewResults(BaseModel):
     fixes: List[Union[ReviewFix, str]] = Field(default_factory=list)
     missing_documents: List[str] = Field(default_factory=list)
     compliance_check: Dict[str, str] = Field(default_factory=dict)
+    document_changes: Optional[DocumentChanges] = None
+    prescreen: Optional[PrescreenResults] = None
 
 class VisualRequest(BaseModel):
     structure_type: str
@@ -66,11 +103,20 @@ class VisualRequest(BaseModel):
 
 class VisualResults(BaseModel):
     image_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    original_url: Optional[str] = None
+    cached: bool = False
     prompt_used: str
     visual_type: str
     status: str
     error: Optional[str] = None
 
+class PermitPackageRequest(BaseModel):
+    project: ProjectData
+    export_type: str = Field(default="pdf", pattern="^(pdf|docx)$")
+    visual_types: List[str] = Field(default_factory=lambda: ["3d_rendering"], max_length=4)
+    bypass_cache: bool = False
+
 class NarrativeResults(BaseModel):
     narrative: str
     word_count: int
@@ -1,17 +1,175 @@
 import openai
+import logging
 import os
 import json
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, AsyncIterable, AsyncIterator, Tuple, Union
 import asyncio
-from models.project import ProjectData, FeasibilityResults, ReviewResults, VisualRequest
+import base64
+import time
+from models.project import ProjectData, FeasibilityResults, ReviewResults, ReviewIssue, ReviewFix, PrescreenResults, VisualRequest
+from services.rule_engine import FeasibilityRuleEngine, RuleEvaluation
+from utils.llm_cache import LLMResponseCache, content_key
+from utils.single_flight import SingleFlight
+from utils.image_store import ImageStore
+from utils.rate_limiter import (
+    OpenAIScheduler, estimate_prompt_tokens,
+    PRIORITY_INTERACTIVE, PRIORITY_REVIEW, PRIORITY_BATCH, PRIORITY_IMAGE
+)
+from utils.text_chunks import CHARS_PER_TOKEN, PAGE_BREAK, ChunkBuilder, TextChunk
+from services.review_merger import merge_review_results
+from services.ordinance_index import OrdinanceIndex
+from services.document_prescreen import DocumentPrescreen
+from utils.cache import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+NARRATIVE_TEMPERATURE = 0.4
+REVIEW_CHUNK_TOKENS = int(os.getenv("REVIEW_CHUNK_TOKENS", "3000"))
+REVIEW_CONCURRENCY = int(os.getenv("REVIEW_CONCURRENCY", "8"))
+REVIEW_MAX_TOKENS = int(os.getenv("REVIEW_MAX_TOKENS", "90000"))
+# Completion limits per endpoint; the scheduler reserves these and refunds the unused part.
+COMPLETION_MAX_TOKENS = {"feasibility": 1500, "narrative": 3000, "review": 2000}
+ORDINANCE_DATA_DIR = os.getenv("ORDINANCE_DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "ordinances"))
+
+class TextPage:
+    def __init__(self, page_number: int, text: str):
+        self.page_number = page_number
+        self.text = text
+
+async def _text_pages(document_text: str) -> AsyncIterator[TextPage]:
+    for page_number, page_text in enumerate(document_text.split(PAGE_BREAK), start=1):
+        yield TextPage(page_number, page_text)
 
 class AIService:
     def __init__(self):
-        self.client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
         self.model = "gpt-4o"
         self.dalle_model = "dall-e-3"
+        self.rule_engine = FeasibilityRuleEngine()
+        self.response_cache = LLMResponseCache()
+        self.single_flight = SingleFlight()
+        self.scheduler = OpenAIScheduler()
+        self.image_store = ImageStore()
+        self.ordinance_index = OrdinanceIndex(ORDINANCE_DATA_DIR, os.path.join(CACHE_DIR, "ordinance_index"))
+    
+    async def _chat(
+        self,
+        endpoint: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        priority: int = PRIORITY_INTERACTIVE,
+        bypass_cache: bool = False,
+        expects_json: bool = False
+    ) -> str:
+        max_tokens = COMPLETION_MAX_TOKENS[endpoint]
+        
+        async def call() -> str:
+            estimated_tokens = estimate_prompt_tokens(*[message["content"] for message in messages], completion_tokens=max_tokens)
+            response = await self.scheduler.submit(priority, estimated_tokens, lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            ))
+            return response.choices[0].message.content
+        
+        key = content_key(model=self.model, messages=messages, temperature=temperature)
+        
+        return await self.single_flight.do(
+            endpoint,
+            f"{key}:{bypass_cache}",
+            lambda: self.response_cache.get_or_call(
+                endpoint,
+                key,
+                call,
+                bypass=bypass_cache,
+                validate=self._is_json if expects_json else None
+            )
+        )
+    
+    def _is_json(self, content: str) -> bool:
+        try:
+            json.loads(content)
+            return True
+        except json.JSONDecodeError:
+            return False
+    
+    async def _ordinance_context(self, query: str) -> Optional[str]:
+        if not self.ordinance_index.loaded:
+            await asyncio.to_thread(self.ordinance_index.ensure_loaded)
+        return self.ordinance_index.prompt_context(query)
+    
+    async def analyze_feasibility(self, project_data: ProjectData, zoning_info: Dict, bypass_cache: bool = False) -> FeasibilityResults:
+        evaluation = self.rule_engine.evaluate(project_data, zoning_info)
+        if evaluation.is_conclusive:
+            return evaluation.to_results()
+        
+        return await self._analyze_feasibility_with_llm(project_data, zoning_info, evaluation, bypass_cache=bypass_cache)
+    
+    # Zoning arrives in groups as lookups finish; each group goes through the vectorized
+    # rule checks at once and the rest is sent to the LLM while later lookups are pending.
+    async def analyze_feasibility_batch(
+        self,
+        projects: List[ProjectData],
+        zoning_groups: AsyncIterable[List[Tuple[int, Dict]]],
+        max_concurrency: int = 4
+    ) -> AsyncIterator[Tuple[int, Union[FeasibilityResults, Exception]]]:
+        semaphore = asyncio.Semaphore(max_concurrency)
+        results: asyncio.Queue = asyncio.Queue()
+        tasks: List[asyncio.Task] = []
+        
+        async def analyze(index: int, zoning_info: Dict, evaluation: RuleEvaluation):
+            async with semaphore:
+                try:
+                    result = await self._analyze_feasibility_with_llm(
+                        projects[index], zoning_info, evaluation, priority=PRIORITY_BATCH
+                    )
+                except Exception as e:
+                    result = e
+            results.put_nowait((index, result))
+        
+        async def evaluate_groups():
+            unresolved = set(range(len(projects)))
+            try:
+                async for group in zoning_groups:
+                    indexes = [index for index, _ in group]
+                    zoning_infos = [zoning_info for _, zoning_info in group]
+                    evaluations = self.rule_engine.evaluate_batch([projects[index] for index in indexes], zoning_infos)
+                    for index, zoning_info, evaluation in zip(indexes, zoning_infos, evaluations):
+                        unresolved.discard(index)
+                        if evaluation.is_conclusive:
+                            results.put_nowait((index, evaluation.to_results()))
+                        else:
+                            tasks.append(asyncio.create_task(analyze(index, zoning_info, evaluation)))
+            except Exception as e:
+                for index in unresolved:
+                    results.put_nowait((index, e))
+                return
+            for index in unresolved:
+                results.put_nowait((index, Exception("No zoning information was resolved")))
+        
+        tasks.append(asyncio.create_task(evaluate_groups()))
+        try:
+            for _ in range(len(projects)):
+                yield await results.get()
+        finally:
+            for task in tasks:
+                task.cancel()
     
-    async def analyze_feasibility(self, project_data: ProjectData, zoning_info: Dict) -> FeasibilityResults:
+    async def _analyze_feasibility_with_llm(
+        self,
+        project_data: ProjectData,
+        zoning_info: Dict,
+        evaluation: RuleEvaluation,
+        priority: int = PRIORITY_INTERACTIVE,
+        bypass_cache: bool = False
+    ) -> FeasibilityResults:
+        rule_check_text = "\n".join(evaluation.summary_lines()) or "No rules could be checked automatically"
+        ordinance_text = await self._ordinance_context(" ".join(str(part) for part in [
+            project_data.structure_type, project_data.location_on_lot, project_data.description,
+            zoning_info.get("district"), zoning_info.get("classification"), *zoning_info.get("restrictions", [])
+        ] if part)) or "No ordinance text available; rely on the zoning information above"
+        
         prompt = f"""
         Analyze the feasibility of this construction project:
         
@@ -20,8 +178,15 @@ class AIService:
         Structure Type: {project_data.structure_type}
         Dimensions: {project_data.dimensions}
         Property Type: {project_data.property_type}
+        Location on Lot: {project_data.location_on_lot}
         
-        Zoning Information: {json.dumps(zoning_info, indent=2)}
+        Zoning Information: {json.dumps(zoning_info, sort_keys=True, separators=(",", ":"))}
+        
+        Relevant Ordinance Sections:
+        {ordinance_text}
+        
+        Automated Rule Checks (already verified, explain rather than re-derive):
+        {rule_check_text}
         
         Provide a detailed feasibility assessment with:
         1. Verdict: "Feasible", "Needs Variance", or "Not Feasible"
@@ -43,17 +208,22 @@ class AIService:
         }}
         """
         
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=[
+        content = await self._chat(
+            "feasibility",
+            [
                 {"role": "system", "content": "You are an expert construction permit analyst with deep knowledge of building codes and zoning regulations."},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.3
+            temperature=0.3,
+            priority=priority,
+            bypass_cache=bypass_cache,
+            expects_json=True
         )
         
         try:
-            result = json.loads(response.choices[0].message.content)
+            result = json.loads(content)
+            result["rule_checks"] = evaluation.checks
+            result["decided_by"] = "llm"
             return FeasibilityResults(**result)
         except json.JSONDecodeError:
             return FeasibilityResults(
@@ -65,15 +235,17 @@ class AIService:
                 required_permits=[]
             )
     
-    async def generate_construction_narrative(self, project_data: ProjectData) -> str:
-        materials_text = f"exterior: {project_data.materials.get('exterior', 'TBD')}, roofing: {project_data.materials.get('roofing', 'TBD')}, foundation: {project_data.materials.get('foundation', 'TBD')}"
+    def _narrative_messages(self, project_data: ProjectData) -> List[Dict[str, str]]:
+        materials = project_data.materials
+        dimensions = project_data.dimensions
+        materials_text = f"exterior: {materials.exterior or 'TBD'}, roofing: {materials.roofing or 'TBD'}, foundation: {materials.foundation or 'TBD'}"
         
         prompt = f"""
         Generate a comprehensive construction narrative/scope of work for this project:
         
         Project: {project_data.description}
         Structure Type: {project_data.structure_type}
-        Dimensions: {project_data.dimensions.get('length', 'TBD')}' x {project_data.dimensions.get('width', 'TBD')}' x {project_data.dimensions.get('height', 'TBD')}'
+        Dimensions: {dimensions.length or 'TBD'}' x {dimensions.width or 'TBD'}' x {dimensions.height or 'TBD'}'
         Materials: {materials_text}
         Location on lot: {project_data.location_on_lot}
         
@@ -90,25 +262,188 @@ class AIService:
         Write in professional permit application language, approximately 300-500 words.
         """
         
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": "You are an expert construction project writer who creates detailed, code-compliant construction narratives for permit applications."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.4
+        return [
+            {"role": "system", "content": "You are an expert construction project writer who creates detailed, code-compliant construction narratives for permit applications."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    async def generate_construction_narrative(self, project_data: ProjectData, bypass_cache: bool = False) -> str:
+        return await self._chat(
+            "narrative",
+            self._narrative_messages(project_data),
+            temperature=NARRATIVE_TEMPERATURE,
+            bypass_cache=bypass_cache
+        )
+    
+    async def stream_construction_narrative(self, project_data: ProjectData, bypass_cache: bool = False) -> AsyncIterator[str]:
+        messages = self._narrative_messages(project_data)
+        key = content_key(model=self.model, messages=messages, temperature=NARRATIVE_TEMPERATURE)
+        
+        if bypass_cache:
+            self.response_cache.record("narrative", "bypassed")
+        else:
+            cached = self.response_cache.get("narrative", key)
+            self.response_cache.record("narrative", "misses" if cached is None else "hits")
+            if cached is not None:
+                yield cached
+                return
+        
+        start = time.perf_counter()
+        prompt_texts = [message["content"] for message in messages]
+        estimated_tokens = estimate_prompt_tokens(*prompt_texts, completion_tokens=COMPLETION_MAX_TOKENS["narrative"])
+        stream = await self.scheduler.submit(
+            PRIORITY_INTERACTIVE,
+            estimated_tokens,
+            lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=NARRATIVE_TEMPERATURE,
+                max_tokens=COMPLETION_MAX_TOKENS["narrative"],
+                stream=True
+            )
         )
         
-        return response.choices[0].message.content
+        parts = []
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        finally:
+            # Stream chunks carry no usage, so the unused reservation is estimated from the text.
+            self.scheduler.refund(estimated_tokens, estimate_prompt_tokens(*prompt_texts, *parts, completion_tokens=0))
+        
+        if parts:
+            self.response_cache.put("narrative", key, "".join(parts), (time.perf_counter() - start) * 1000)
     
-    async def review_permit_application(self, document_text: str, project_info: Dict) -> ReviewResults:
+    async def review_permit_application(self, document_text: str, project_info: Dict, bypass_cache: bool = False) -> ReviewResults:
+        return await self.review_permit_pages(_text_pages(document_text), project_info, bypass_cache)
+    
+    # Pages are packed into chunks as they arrive and each chunk is sent for review
+    # as soon as the next one starts, so the LLM works while later pages are still
+    # being extracted. Reading stops once the token budget is reached.
+    async def review_permit_pages(
+        self,
+        pages: AsyncIterable[Any],
+        project_info: Dict,
+        bypass_cache: bool = False,
+        max_tokens: int = REVIEW_MAX_TOKENS
+    ) -> ReviewResults:
+        ordinance_text = await self._ordinance_context(
+            "permit application submittal requirements site plan " +
+            " ".join(str(value) for value in project_info.values() if isinstance(value, (str, int, float)))
+        )
+        semaphore = asyncio.Semaphore(REVIEW_CONCURRENCY)
+        builder = ChunkBuilder(REVIEW_CHUNK_TOKENS)
+        prescreen = DocumentPrescreen()
+        chunks: List[TextChunk] = []
+        tasks: List[asyncio.Task] = []
+        
+        async def review(chunk: TextChunk, part_label: Optional[str]) -> Optional[ReviewResults]:
+            prescreen_notes = prescreen.prompt_notes(chunk.first_page, chunk.last_page)
+            async with semaphore:
+                try:
+                    return await self._review_chunk(chunk.text, project_info, part_label, ordinance_text, prescreen_notes, bypass_cache)
+                except Exception as e:
+                    if part_label is None:
+                        raise
+                    logger.warning("Review of %s failed: %s", chunk.label, e)
+                    return None
+        
+        def launch(chunk: TextChunk, single: bool):
+            # Labelled by page range rather than ordinal, so a chunk's prompt (and cache key)
+            # depends only on its own pages.
+            part_label = None if single else f"the part covering {chunk.label}"
+            tasks.append(asyncio.create_task(review(chunk, part_label)))
+        
+        def add(new_chunks: List[TextChunk]):
+            for chunk in new_chunks:
+                # Held back one chunk so a document that fits in a single chunk keeps the whole-document prompt.
+                if chunks:
+                    launch(chunks[-1], single=False)
+                chunks.append(chunk)
+        
+        extracted_chars = 0
+        unread_from: Optional[int] = None
+        iterator = pages.__aiter__()
+        try:
+            async for page in iterator:
+                # The budget is checked before a page is added, so it is never overshot and the
+                # coverage note only names pages that exist. A first page larger than the whole
+                # budget is reviewed up to the limit.
+                text = page.text or ""
+                remaining = max_tokens * CHARS_PER_TOKEN - extracted_chars
+                if len(text) > remaining:
+                    if extracted_chars:
+                        unread_from = page.page_number
+                        break
+                    text = text[:remaining]
+                # Scanned before chunking so a chunk's pages are pre-screened by the time it is sent.
+                prescreen.add_page(page.page_number, text)
+                add(builder.add_page(page.page_number, text))
+                extracted_chars += len(text)
+            add(builder.finish())
+            if not tasks and unread_from is None and prescreen.obviously_incomplete:
+                return self._incomplete_submission_result(prescreen)
+            if chunks:
+                launch(chunks[-1], single=len(chunks) == 1)
+            else:
+                chunks.append(TextChunk("", 1, 1))
+                launch(chunks[0], single=True)
+            
+            partials = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        finally:
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+        
+        reviewed = [(chunk.label, result) for chunk, result in zip(chunks, partials) if result is not None]
+        if not reviewed:
+            return self._review_error_result()
+        if len(chunks) == 1:
+            result = reviewed[0][1]
+        else:
+            failed = [chunk.label for chunk, result in zip(chunks, partials) if result is None]
+            result = merge_review_results(reviewed, failed)
+        
+        result = result.model_copy(update={"prescreen": PrescreenResults(**prescreen.results())})
+        if unread_from is not None:
+            result = result.model_copy(update={"issues": result.issues + [ReviewIssue(
+                category="Review Coverage",
+                description=f"Pages from {unread_from} on were not reviewed: the document exceeds the {max_tokens}-token review limit",
+                severity="Medium"
+            )]})
+        return result
+    
+    async def _review_chunk(
+        self,
+        document_text: str,
+        project_info: Dict,
+        part_label: Optional[str],
+        ordinance_text: Optional[str],
+        prescreen_notes: Optional[str],
+        bypass_cache: bool
+    ) -> Optional[ReviewResults]:
+        ordinances = f"Relevant Ordinance Sections (cite these when flagging code issues):\n{ordinance_text}\n" if ordinance_text else ""
+        prescreen = f"Automated Pre-screen of this text (already located; build on it instead of re-listing it):\n{prescreen_notes}\n" if prescreen_notes else ""
+        scope = f"This is {part_label} of the submitted document. Judge only what this part contains; do not report documents as missing just because they are not in this part unless the part indicates they should be here." if part_label else ""
+        
         prompt = f"""
         Review this permit application document for completeness and compliance:
         
-        Project Information: {json.dumps(project_info, indent=2)}
+        Project Information: {json.dumps(project_info, sort_keys=True, separators=(",", ":"))}
         
+        {ordinances}
+        {prescreen}
+        {scope}
         Document Content:
-        {document_text[:4000]}...
+        {document_text}
         
         Analyze the document for:
         1. Missing required fields, signatures, or attachments
@@ -147,29 +482,53 @@ class AIService:
         }}
         """
         
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=[
+        content = await self._chat(
+            "review",
+            [
                 {"role": "system", "content": "You are an experienced permit reviewer who evaluates construction permit applications for municipalities. You identify issues that commonly lead to rejections."},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.2
+            temperature=0.2,
+            priority=PRIORITY_REVIEW,
+            bypass_cache=bypass_cache,
+            expects_json=True
         )
         
         try:
-            result = json.loads(response.choices[0].message.content)
+            result = json.loads(content)
             return ReviewResults(**result)
         except json.JSONDecodeError:
-            return ReviewResults(
-                rejection_risk="High",
-                confidence_score=0,
-                risk_summary="Error processing document review",
-                overall_assessment="Unable to analyze document due to processing error",
-                issues=[{"category": "System Error", "description": "Document could not be properly analyzed", "severity": "Critical"}],
-                fixes=[{"category": "System", "description": "Please re-upload the document or try with a different file format", "priority": "High"}],
-                missing_documents=[],
-                compliance_check={}
-            )
+            return None
+    
+    # Answered from the pre-screen alone when the upload is obviously incomplete.
+    def _incomplete_submission_result(self, prescreen: DocumentPrescreen) -> ReviewResults:
+        results = prescreen.results(llm_review_skipped=True)
+        return ReviewResults(
+            rejection_risk="High",
+            confidence_score=80,
+            risk_summary="The submission is missing basic application content and would be returned before plan review",
+            overall_assessment="The automated pre-screen found this document incomplete, so it was not sent for a full review. Add the missing items and upload it again.",
+            issues=[ReviewIssue(category="Completeness", description=issue, severity="High") for issue in results["issues"]],
+            fixes=[ReviewFix(category="Completeness", description=fix, priority="High") for fix in prescreen.fixes()],
+            missing_documents=[],
+            compliance_check={
+                "signatures": "Pass" if results["has_signature_section"] else "Fail",
+                "narrative_completeness": "Pass" if results["has_project_description"] else "Fail"
+            },
+            prescreen=PrescreenResults(**results)
+        )
+    
+    def _review_error_result(self) -> ReviewResults:
+        return ReviewResults(
+            rejection_risk="High",
+            confidence_score=0,
+            risk_summary="Error processing document review",
+            overall_assessment="Unable to analyze document due to processing error",
+            issues=[{"category": "System Error", "description": "Document could not be properly analyzed", "severity": "Critical"}],
+            fixes=[{"category": "System", "description": "Please re-upload the document or try with a different file format", "priority": "High"}],
+            missing_documents=[],
+            compliance_check={}
+        )
     
     async def generate_visual(self, visual_request: VisualRequest) -> Dict[str, Any]:
         visual_type_prompts = {
@@ -181,27 +540,32 @@ class AIService:
         
         base_prompt = visual_type_prompts.get(visual_request.visual_type, "Create a diagram of")
         
-        project_details = f"{visual_request.structure_type} measuring {visual_request.dimensions.get('length', 24)} by {visual_request.dimensions.get('width', 30)} feet"
+        dimensions = visual_request.dimensions
+        project_details = f"{visual_request.structure_type} measuring {dimensions.length or 24} by {dimensions.width or 30} feet"
         
         if visual_request.materials:
-            materials_text = f" with {visual_request.materials.get('exterior', 'standard')} exterior and {visual_request.materials.get('roofing', 'asphalt shingle')} roofing"
+            materials = visual_request.materials
+            materials_text = f" with {materials.exterior or 'standard'} exterior and {materials.roofing or 'asphalt shingle'} roofing"
             project_details += materials_text
         
         custom_additions = f". {visual_request.custom_prompt}" if visual_request.custom_prompt else ""
         
         full_prompt = f"{base_prompt} {project_details}{custom_additions}. Architectural style, clean lines, professional presentation suitable for permit documentation."
         
+        prompt = full_prompt[:1000]
+        key = content_key(model=self.dalle_model, prompt=prompt, size="1024x1024", quality="standard")
+        
         try:
-            response = await self.client.images.generate(
-                model=self.dalle_model,
-                prompt=full_prompt[:1000],
-                size="1024x1024",
-                quality="standard",
-                n=1
-            )
+            cached = self.image_store.contains(key)
+            if not cached:
+                await self.single_flight.do("visual", key, lambda: self._generate_and_store_image(key, prompt))
             
+            urls = self.image_store.urls(key)
             return {
-                "image_url": response.data[0].url,
+                "image_url": urls["web"],
+                "thumbnail_url": urls["thumbnail"],
+                "original_url": urls["original"],
+                "cached": cached,
                 "prompt_used": full_prompt,
                 "visual_type": visual_request.visual_type,
                 "status": "success"
@@ -214,4 +578,23 @@ class AIService:
                 "prompt_used": full_prompt,
                 "visual_type": visual_request.visual_type,
                 "status": "error"
-            }
\ No newline at end of file
+            }
+    
+    async def _generate_and_store_image(self, key: str, prompt: str):
+        image_bytes = await self._generate_image(prompt)
+        await asyncio.to_thread(self.image_store.put, key, image_bytes, prompt)
+    
+    async def _generate_image(self, prompt: str) -> bytes:
+        response = await self.scheduler.submit(
+            PRIORITY_IMAGE,
+            0,
+            lambda: self.client.images.generate(
+                model=self.dalle_model,
+                prompt=prompt,
+                size="1024x1024",
+                quality="standard",
+                response_format="b64_json",
+                n=1
+            )
+        )
+        return base64.b64decode(response.data[0].b64_json)
\ No newline at end of file
@@ -0,0 +1,142 @@
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+PRESCREEN_MIN_WORDS = int(os.getenv("PRESCREEN_MIN_WORDS", "25"))
+# Submissions missing this many of the five basics are answered without an LLM call.
+PRESCREEN_MAX_MISSING = int(os.getenv("PRESCREEN_MAX_MISSING", "4"))
+PRESCREEN_MAX_FINDINGS = 5
+SNIPPET_CHARS = 80
+
+MONTHS = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+NUMBER = r"\d+(?:\.\d+)?"
+
+# Category -> (result key, issue when absent, pattern). Order matters: at any position
+# the first alternative that matches wins, so dates are tried before dimensions.
+CHECKS: Dict[str, Tuple[str, str, str]] = {
+    "signature": (
+        "has_signature_section", "No signature section found",
+        r"\b(?:applicant|owner|contractor)?\s*signature\b|\bsigned\s+by\b|\bsign\s+(?:here|below)\b"
+    ),
+    "date": (
+        "has_date_fields", "No date information found",
+        rf"\bdated?\s*:|\bdated\b|\b\d{{1,2}}[/-]\d{{1,2}}[/-](?:19|20)?\d{{2}}\b|\b{MONTHS}\s+\d{{1,2}},?\s+(?:19|20)\d{{2}}\b"
+    ),
+    "contact": (
+        "has_contact_info", "Missing contact information",
+        r"\b[\w.+-]+@[\w-]+\.[\w.-]+\b|\(?\b\d{3}\)?[-.\s]\d{3}[-.\s]\d{4}\b|\b(?:phone|telephone|e-?mail|contact|address)\b"
+    ),
+    "dimension": (
+        "has_dimensions", "Missing dimensional information",
+        rf"\b{NUMBER}\s*['\"]?\s*[x×]\s*{NUMBER}\b|\b{NUMBER}\s*(?:'|\"|(?:ft|feet|foot|in|inches|sq\.?\s*ft|square\s+feet)\b)"
+    ),
+    "description": (
+        "has_project_description", "Missing project description",
+        r"\bproject\s+description\b|\bscope\s+of\s+work\b|\bconstruction\b|\bbuilding\b"
+    ),
+}
+
+# One combined pattern: each page is scanned once and match.lastgroup names the category.
+PRESCREEN_PATTERN = re.compile("|".join(f"(?P<{category}>{check[2]})" for category, check in CHECKS.items()), re.I)
+
+FIXES = {
+    "signature": "Add a signed and dated applicant or owner signature block",
+    "date": "Date the application and every drawing sheet",
+    "contact": "Add the applicant's phone number, email and mailing address",
+    "dimension": "Label structure dimensions, height and setbacks in feet and inches",
+    "description": "Add a project description or scope of work",
+}
+
+LABELS = {
+    "signature": "Signature block",
+    "date": "Dates",
+    "contact": "Contact information",
+    "dimension": "Dimensions",
+    "description": "Project description",
+}
+
+
+def _snippet(text: str, start: int, end: int) -> str:
+    line_start = text.rfind("\n", 0, start) + 1
+    line_end = text.find("\n", end)
+    line = text[line_start:line_end if line_end >= 0 else len(text)].strip()
+    return line[:SNIPPET_CHARS]
+
+
+def _page_span(pages: List[int]) -> str:
+    if len(pages) == 1:
+        return f"page {pages[0]}"
+    if len(pages) <= 3:
+        return "pages " + ", ".join(str(page) for page in pages)
+    return f"pages {pages[0]}-{pages[-1]}"
+
+
+# Accumulates matches page by page, so it can run on pages as they are extracted.
+class DocumentPrescreen:
+    def __init__(self, max_findings: int = PRESCREEN_MAX_FINDINGS):
+        self.max_findings = max_findings
+        self.word_count = 0
+        self.findings: Dict[str, List[Dict[str, Any]]] = {category: [] for category in CHECKS}
+        # page -> category -> [count, first snippet]
+        self.pages: Dict[int, Dict[str, List[Any]]] = {}
+
+    def add_page(self, page_number: int, text: str):
+        self.word_count += len(text.split())
+        page = self.pages.setdefault(page_number, {})
+        for match in PRESCREEN_PATTERN.finditer(text):
+            category = match.lastgroup
+            if category in page:
+                page[category][0] += 1
+                continue
+
+            snippet = _snippet(text, match.start(), match.end())
+            page[category] = [1, snippet]
+            if len(self.findings[category]) < self.max_findings:
+                self.findings[category].append({"page": page_number, "offset": match.start(), "text": snippet})
+
+    def found(self, category: str) -> bool:
+        return bool(self.findings[category])
+
+    @property
+    def missing(self) -> List[str]:
+        return [category for category in CHECKS if not self.found(category)]
+
+    @property
+    def obviously_incomplete(self) -> bool:
+        return self.word_count < PRESCREEN_MIN_WORDS or len(self.missing) >= PRESCREEN_MAX_MISSING
+
+    def results(self, llm_review_skipped: bool = False) -> Dict[str, Any]:
+        results: Dict[str, Any] = {CHECKS[category][0]: self.found(category) for category in CHECKS}
+        issues = [CHECKS[category][1] for category in self.missing]
+        if self.word_count < PRESCREEN_MIN_WORDS:
+            issues.insert(0, f"Only {self.word_count} words of readable text were found")
+        results.update({
+            "word_count": self.word_count,
+            "issues": issues,
+            "findings": {category: findings for category, findings in self.findings.items() if findings},
+            "llm_review_skipped": llm_review_skipped
+        })
+        return results
+
+    def fixes(self) -> List[str]:
+        fixes = [FIXES[category] for category in self.missing]
+        if self.word_count < PRESCREEN_MIN_WORDS:
+            fixes.insert(0, "Upload the complete application; if it is a scan, make sure the pages are legible")
+        return fixes
+
+    # Short notes for the review prompt about what the pre-screen already located on
+    # the given pages, so the model does not spend tokens finding them again.
+    def prompt_notes(self, first_page: int, last_page: int) -> str:
+        lines = []
+        for category in CHECKS:
+            located = [
+                (page_number, self.pages[page_number][category])
+                for page_number in range(first_page, last_page + 1)
+                if category in self.pages.get(page_number, {})
+            ]
+            if located:
+                count = sum(entry[0] for _, entry in located)
+                lines.append(f"- {LABELS[category]}: {count} on {_page_span([page for page, _ in located])}, e.g. \"{located[0][1][1]}\"")
+            else:
+                lines.append(f"- {LABELS[category]}: none detected")
+        return "\n".join(lines)
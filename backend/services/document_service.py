@@ -1,127 +1,279 @@
-import pytesseract
 import pdfplumber
-from PIL import Image
-from docx import Document
+import asyncio
+import hashlib
+import logging
 import os
+import threading
+import time
+import zipfile
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple
+from lxml import etree
+from pdfminer.psparser import PSException
+from utils.text_chunks import PAGE_BREAK
+from utils.ocr_pool import OCRBatch, OCRPool
+from utils.page_cache import EXTRACTION_VERSION, PageTextCache, pdf_page_fingerprint
+from utils.pdf_text import PDF_TEXT_MODE, PDF_TEXT_MODES, TextLayerReader
+from utils.docx_text import iter_docx_blocks
+
+logger = logging.getLogger(__name__)
+
+# Pages the reader thread may extract ahead of the consumer.
+PDF_READ_AHEAD = int(os.getenv("PDF_READ_AHEAD", "4"))
+
+# The upload has the right file signature but its contents cannot be parsed.
+class UnreadableDocumentError(Exception):
+    pass
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+class PageRecord:
+    def __init__(self, page_number: int, text: Optional[str], source: str, elapsed_ms: float, page_hash: str = "", cached: bool = False):
+        self.page_number = page_number
+        self.text = text
+        # "text" (pdfminer text layer), "layout" (pdfplumber), "ocr" or "docx"
+        self.source = source
+        self.elapsed_ms = elapsed_ms
+        self.page_hash = page_hash
+        self.cached = cached
+
+# Iterating yields page records as they are extracted; a consumer can stop early,
+# which closes the underlying reader and cancels outstanding OCR. The version
+# record (and the change report) is only written once every page has been read.
+class DocumentExtraction:
+    def __init__(self, service: "DocumentService", file_path: str, document_key: Optional[str] = None, sha256: Optional[str] = None):
+        self.service = service
+        self.file_path = file_path
+        self.document_key = document_key
+        self.sha256 = sha256
+        self.page_hashes: List[str] = []
+        self.pages_from_cache = 0
+        self.complete = False
+        self.changes: Optional[Dict[str, Any]] = None
+        self.text = ""
+    
+    async def __aiter__(self) -> AsyncIterator[PageRecord]:
+        try:
+            self.sha256 = self.sha256 or await asyncio.to_thread(file_sha256, self.file_path)
+            records = self.service.iter_pages(self.file_path, self.sha256)
+            try:
+                async for record in records:
+                    self.page_hashes.append(record.page_hash)
+                    self.pages_from_cache += record.cached
+                    yield record
+            finally:
+                await records.aclose()
+        except (asyncio.CancelledError, GeneratorExit, UnreadableDocumentError):
+            raise
+        except Exception as e:
+            raise Exception(f"Failed to extract text from document: {str(e)}")
+        
+        self.complete = True
+        if self.document_key:
+            self.changes = await asyncio.to_thread(self.service.page_cache.record_version, self.document_key, self.sha256, self.page_hashes)
+    
+    async def read(self) -> str:
+        pages = [record.text async for record in self]
+        # Strip only blank lines so leading empty pages keep their page breaks and numbering.
+        text = PAGE_BREAK.join(page_text + "\n" if page_text else "" for page_text in pages)
+        self.text = text.strip(" \n") if text.strip() else ""
+        return self.text
 
 class DocumentService:
-    def __init__(self):
-        self.supported_formats = ['.pdf', '.docx', '.doc', '.jpg', '.jpeg', '.png']
+    def __init__(self, ocr_pool: OCRPool = None, page_cache: PageTextCache = None, text_mode: str = PDF_TEXT_MODE):
+        if text_mode not in PDF_TEXT_MODES:
+            raise ValueError(f"Unknown PDF text mode: {text_mode}")
+        self.supported_formats = ['.pdf', '.docx', '.jpg', '.jpeg', '.png']
+        self.text_mode = text_mode
+        self.ocr_pool = ocr_pool or OCRPool()
+        self.page_cache = page_cache or PageTextCache()
     
-    def extract_text(self, file_path: str) -> str:
+    async def extract_text(self, file_path: str) -> str:
+        return (await self.extract_document(file_path)).text
+    
+    async def extract_document(self, file_path: str, document_key: Optional[str] = None, sha256: Optional[str] = None) -> DocumentExtraction:
+        document = self.open_document(file_path, document_key, sha256)
+        await document.read()
+        return document
+    
+    def open_document(self, file_path: str, document_key: Optional[str] = None, sha256: Optional[str] = None) -> DocumentExtraction:
+        return DocumentExtraction(self, file_path, document_key, sha256)
+    
+    async def iter_pages(self, file_path: str, sha256: str) -> AsyncIterator[PageRecord]:
         file_extension = os.path.splitext(file_path)[1].lower()
         
-        try:
-            if file_extension == '.pdf':
-                return self._extract_pdf_text(file_path)
-            elif file_extension in ['.docx', '.doc']:
-                return self._extract_docx_text(file_path)
-            elif file_extension in ['.jpg', '.jpeg', '.png']:
-                return self._extract_image_text(file_path)
-            else:
-                raise ValueError(f"Unsupported file format: {file_extension}")
+        if file_extension == '.pdf':
+            records = self._iter_pdf_pages(file_path)
+            try:
+                async for record in records:
+                    yield record
+            finally:
+                await records.aclose()
+        elif file_extension == '.docx':
+            yield await self._whole_file_record(sha256, 'docx', lambda: asyncio.to_thread(self._extract_docx_text, file_path))
+        elif file_extension in ['.jpg', '.jpeg', '.png']:
+            yield await self._whole_file_record(sha256, 'ocr', lambda: self._extract_image_text(file_path))
+        else:
+            raise ValueError(f"Unsupported file format: {file_extension}")
+    
+    async def _whole_file_record(self, sha256: str, method: str, extract) -> PageRecord:
+        start = time.perf_counter()
+        page_hash = f"{method}:v{EXTRACTION_VERSION}:{sha256}"
+        cached = self.page_cache.get_many([page_hash])
+        if page_hash in cached:
+            return PageRecord(1, cached[page_hash][0], method, elapsed_ms(start), page_hash, cached=True)
         
+        text = await extract()
+        self.page_cache.put_many({page_hash: text}, method)
+        return PageRecord(1, text, method, elapsed_ms(start), page_hash)
+    
+    def _page_fingerprint(self, page) -> str:
+        try:
+            return pdf_page_fingerprint(page)
         except Exception as e:
-            raise Exception(f"Failed to extract text from document: {str(e)}")
+            logger.warning("Page fingerprint error: %s", e)
+            return ""
     
-    def _extract_pdf_text(self, file_path: str) -> str:
-        text = ""
+    # Runs in a worker thread one page at a time. Pages that need OCR are yielded
+    # with text=None and filled in by _iter_pdf_pages.
+    def _read_pdf_pages(self, file_path: str) -> Iterator[PageRecord]:
+        layout_pdf = None
         try:
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
+            with TextLayerReader(file_path) as reader:
+                for page_index, page in enumerate(reader.pages()):
+                    start = time.perf_counter()
+                    page_hash = self._page_fingerprint(page)
+                    cached = self.page_cache.get_many([page_hash]) if page_hash else {}
+                    if page_hash in cached:
+                        text, method = cached[page_hash]
+                        yield PageRecord(page_index + 1, text, method, elapsed_ms(start), page_hash, cached=True)
+                        continue
+                    
+                    source, text = 'layout', None
+                    if self.text_mode == 'fast':
+                        try:
+                            page_text = reader.read(page)
+                            if page_text.needs_ocr:
+                                source = 'ocr'
+                            elif page_text.usable:
+                                source, text = 'text', page_text.text
+                        except Exception as e:
+                            logger.warning("Text layer error on page %d: %s", page_index + 1, e)
                     
-                    if not page_text and page.images:
-                        for image in page.images:
-                            try:
-                                bbox = (image['x0'], image['top'], image['x1'], image['bottom'])
-                                cropped_page = page.crop(bbox)
-                                page_image = cropped_page.to_image()
-                                pil_image = page_image.original
-                                ocr_text = pytesseract.image_to_string(pil_image)
-                                text += ocr_text + "\n"
-                            except:
-                                continue
+                    # Full pdfplumber layout analysis only for pages the fast path could not read.
+                    if source == 'layout':
+                        layout_pdf = layout_pdf or pdfplumber.open(file_path)
+                        layout_page = layout_pdf.pages[page_index]
+                        text = layout_page.extract_text() or ""
+                        if not text and layout_page.images:
+                            source, text = 'ocr', None
+                        layout_page.flush_cache()
+                    
+                    if text is not None and page_hash:
+                        self.page_cache.put_many({page_hash: text}, source)
+                    yield PageRecord(page_index + 1, text, source, elapsed_ms(start), page_hash)
+        except PSException as e:
+            raise UnreadableDocumentError(f"PDF could not be parsed: {e}") from e
+        finally:
+            if layout_pdf is not None:
+                layout_pdf.close()
+    
+    # The reader runs the page generator in one worker thread and hands records over
+    # through a queue. Stopping sets a flag and waits for the page in progress, so the
+    # generator is always closed by the thread that runs it.
+    def _read_pdf_pages_into(self, file_path: str, put, slots: threading.Semaphore, stop: threading.Event):
+        pages = self._read_pdf_pages(file_path)
+        try:
+            for record in pages:
+                slots.acquire()
+                if stop.is_set():
+                    break
+                put(record)
         except Exception as e:
-            raise Exception(f"Error processing PDF: {str(e)}")
+            put(e)
+        finally:
+            pages.close()
+            put(None)
+    
+    async def _iter_pdf_pages(self, file_path: str) -> AsyncIterator[PageRecord]:
+        loop = asyncio.get_running_loop()
+        records: asyncio.Queue = asyncio.Queue()
+        slots = threading.Semaphore(PDF_READ_AHEAD)
+        stop = threading.Event()
+        reader = loop.run_in_executor(
+            None, self._read_pdf_pages_into, file_path, lambda item: loop.call_soon_threadsafe(records.put_nowait, item), slots, stop
+        )
+        batch = self.ocr_pool.batch()
+        pending: Deque[Tuple[PageRecord, Optional[asyncio.Future], float]] = deque()
+        
+        def ready() -> bool:
+            record, future, _ = pending[0]
+            return record.text is not None or future is None or future.done()
         
-        return text.strip()
+        try:
+            while True:
+                record = await records.get()
+                if record is None:
+                    break
+                if isinstance(record, Exception):
+                    raise record
+                slots.release()
+                
+                # Scanned pages are OCR'd in the pool while later pages are read; records
+                # are still released in page order.
+                future = batch.submit_pdf_page(file_path, record.page_number - 1) if record.text is None else None
+                pending.append((record, future, time.perf_counter()))
+                while pending and ready():
+                    yield await self._finish_page(batch, *pending.popleft())
+            
+            while pending:
+                yield await self._finish_page(batch, *pending.popleft())
+        finally:
+            batch.cancel([future for _, future, _ in pending])
+            stop.set()
+            slots.release()
+            # asyncio.wait does not cancel the reader if this task is cancelled again.
+            await asyncio.wait([reader])
+    
+    async def _finish_page(self, batch: OCRBatch, record: PageRecord, future: Optional[asyncio.Future], submitted: float) -> PageRecord:
+        if record.text is not None:
+            return record
+        
+        text = await batch.result(future)
+        if text is not None:
+            record.text = text
+            if record.page_hash:
+                self.page_cache.put_many({record.page_hash: text}, 'ocr')
+        elif future is None:
+            record.text = f"[Page {record.page_number} was not OCR'd: the {self.ocr_pool.page_budget}-page scan budget was exceeded]"
+        else:
+            record.text = f"[Page {record.page_number} could not be OCR'd]"
+        record.elapsed_ms += elapsed_ms(submitted)
+        return record
     
     def _extract_docx_text(self, file_path: str) -> str:
         try:
-            doc = Document(file_path)
-            text = ""
-            
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        text += cell.text + " "
-                    text += "\n"
-            
-            return text.strip()
+            return "\n".join(iter_docx_blocks(file_path))
             
+        except (zipfile.BadZipFile, KeyError, etree.XMLSyntaxError) as e:
+            raise UnreadableDocumentError(f"DOCX could not be parsed: {e}") from e
         except Exception as e:
             raise Exception(f"Error processing DOCX: {str(e)}")
     
-    def _extract_image_text(self, file_path: str) -> str:
+    async def _extract_image_text(self, file_path: str) -> str:
         try:
-            image = Image.open(file_path)
-            
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            text = pytesseract.image_to_string(image, config='--psm 6')
+            text = await self.ocr_pool.ocr_image(file_path)
+            if text is None:
+                raise Exception("OCR did not finish within the time limit")
             return text.strip()
             
         except Exception as e:
-            raise Exception(f"Error processing image: {str(e)}")
-    
-    def validate_document_structure(self, text: str) -> dict:
-        validation_results = {
-            'has_signature_section': False,
-            'has_date_fields': False,
-            'has_contact_info': False,
-            'has_project_description': False,
-            'has_dimensions': False,
-            'word_count': len(text.split()),
-            'issues': []
-        }
-        
-        text_lower = text.lower()
-        
-        signature_keywords = ['signature', 'signed by', 'applicant signature', 'owner signature']
-        if any(keyword in text_lower for keyword in signature_keywords):
-            validation_results['has_signature_section'] = True
-        else:
-            validation_results['issues'].append("No signature section found")
-        
-        date_patterns = ['date:', '/20', '-20', 'dated']
-        if any(pattern in text_lower for pattern in date_patterns):
-            validation_results['has_date_fields'] = True
-        else:
-            validation_results['issues'].append("No date information found")
-        
-        contact_keywords = ['phone', 'email', 'address', 'contact']
-        if any(keyword in text_lower for keyword in contact_keywords):
-            validation_results['has_contact_info'] = True
-        else:
-            validation_results['issues'].append("Missing contact information")
-        
-        description_keywords = ['project description', 'scope of work', 'construction', 'building']
-        if any(keyword in text_lower for keyword in description_keywords):
-            validation_results['has_project_description'] = True
-        else:
-            validation_results['issues'].append("Missing project description")
-        
-        dimension_patterns = ["ft", "feet", "inches", "'", '"', "x", "square feet", "sq ft"]
-        if any(pattern in text_lower for pattern in dimension_patterns):
-            validation_results['has_dimensions'] = True
-        else:
-            validation_results['issues'].append("Missing dimensional information")
-        
-        return validation_results
\ No newline at end of file
+            raise Exception(f"Error processing image: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,237 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.text_chunks import estimate_tokens, split_into_sections
+
+ORDINANCE_CHUNK_TOKENS = int(os.getenv("ORDINANCE_CHUNK_TOKENS", "350"))
+ORDINANCE_TOP_K = int(os.getenv("ORDINANCE_TOP_K", "4"))
+ORDINANCE_CONTEXT_TOKENS = int(os.getenv("ORDINANCE_CONTEXT_TOKENS", "1200"))
+ARRAY_NAMES = ["term_offsets", "posting_sections", "posting_weights", "text_offsets"]
+
+# Keeps district codes ("SR-C1") and section numbers ("28.032") as single terms.
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-.][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or shall that the this to with which any all "
+    "may not no such than been being into per will".split()
+)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class OrdinanceIndex:
+    def __init__(self, data_dir: str, cache_dir: str, chunk_tokens: int = ORDINANCE_CHUNK_TOKENS):
+        self.data_dir = data_dir
+        self.cache_dir = cache_dir
+        self.chunk_tokens = chunk_tokens
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.terms: Dict[str, int] = {}
+        self.sections: List[Tuple[str, str]] = []
+        self.corpus_tokens = 0
+        self.stats = {"searches": 0, "total_search_ms": 0.0, "max_search_ms": 0.0, "injected_tokens": 0, "tokens_saved": 0}
+
+    def _source_files(self) -> List[str]:
+        return sorted(
+            glob.glob(os.path.join(self.data_dir, "*.txt")) +
+            glob.glob(os.path.join(self.data_dir, "*.md"))
+        )
+
+    def _fingerprint(self, files: List[str]) -> str:
+        digest = hashlib.sha256(f"chunk_tokens={self.chunk_tokens}".encode())
+        for path in files:
+            stat = os.stat(path)
+            digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()[:16]
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    # Compiling a large ordinance corpus takes seconds; async callers run this in a thread.
+    def ensure_loaded(self) -> bool:
+        if self._loaded:
+            return bool(self.sections)
+
+        with self._lock:
+            if self._loaded:
+                return bool(self.sections)
+
+            files = self._source_files() if os.path.isdir(self.data_dir) else []
+            if files:
+                compiled_dir = os.path.join(self.cache_dir, self._fingerprint(files))
+                if not os.path.exists(os.path.join(compiled_dir, "meta.json")):
+                    self._compile(files, compiled_dir)
+                self._load_compiled(compiled_dir)
+            self._loaded = True
+            return bool(self.sections)
+
+    def _compile(self, files: List[str], compiled_dir: str):
+        sections: List[Tuple[str, str]] = []
+        texts: List[str] = []
+        for path in files:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                source = os.path.splitext(os.path.basename(path))[0]
+                for chunk in split_into_sections(f.read(), self.chunk_tokens):
+                    title = next((line.strip() for line in chunk.text.splitlines() if line.strip()), "")[:100]
+                    sections.append((source, title))
+                    texts.append(chunk.text)
+
+        if not sections:
+            self._write_compiled(compiled_dir, {}, b"", {"terms": [], "sections": [], "corpus_tokens": 0})
+            return
+
+        postings: Dict[str, Dict[int, int]] = {}
+        lengths = np.zeros(len(texts), dtype=np.float64)
+        for section_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[section_id] = len(tokens)
+            for token in tokens:
+                counts = postings.setdefault(token, {})
+                counts[section_id] = counts.get(section_id, 0) + 1
+
+        # BM25 weights depend only on the corpus, so each posting stores its final
+        # per-term score and a query is just a gather and a bincount.
+        average_length = max(lengths.mean(), 1.0)
+        terms = sorted(postings)
+        term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        posting_sections, posting_weights = [], []
+        for term_id, term in enumerate(terms):
+            section_ids = np.fromiter(postings[term].keys(), dtype=np.int32, count=len(postings[term]))
+            frequencies = np.fromiter(postings[term].values(), dtype=np.float64, count=len(postings[term]))
+            idf = np.log(1 + (len(texts) - len(section_ids) + 0.5) / (len(section_ids) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[section_ids] / average_length)
+            posting_sections.append(section_ids)
+            posting_weights.append((idf * frequencies * (BM25_K1 + 1) / (frequencies + norm)).astype(np.float32))
+            term_offsets[term_id + 1] = term_offsets[term_id] + len(section_ids)
+
+        encoded = [text.encode("utf-8") for text in texts]
+        text_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(blob) for blob in encoded], out=text_offsets[1:])
+
+        arrays = {
+            "term_offsets": term_offsets,
+            "posting_sections": np.concatenate(posting_sections),
+            "posting_weights": np.concatenate(posting_weights),
+            "text_offsets": text_offsets,
+        }
+        self._write_compiled(compiled_dir, arrays, b"".join(encoded), {
+            "terms": terms,
+            "sections": sections,
+            "corpus_tokens": sum(estimate_tokens(text) for text in texts)
+        })
+
+    # Writes into a temporary directory and renames it into place, so a crash or a
+    # concurrent worker never leaves a partial index that a later start would load.
+    def _write_compiled(self, compiled_dir: str, arrays: Dict[str, np.ndarray], section_text: bytes, meta: Dict[str, Any]):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".compile-", dir=self.cache_dir)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(staging, f"{name}.npy"), array)
+            with open(os.path.join(staging, "sections.bin"), "wb") as f:
+                f.write(section_text)
+            with open(os.path.join(staging, "meta.json"), "w") as f:
+                json.dump(meta, f)
+
+            if os.path.isdir(compiled_dir):
+                shutil.rmtree(compiled_dir)
+            os.replace(staging, compiled_dir)
+        finally:
+            if os.path.isdir(staging):
+                shutil.rmtree(staging, ignore_errors=True)
+
+    def _load_compiled(self, compiled_dir: str):
+        meta_path = os.path.join(compiled_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            return
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if not meta["sections"]:
+            return
+
+        for name in ARRAY_NAMES:
+            setattr(self, name, np.asarray(np.load(os.path.join(compiled_dir, f"{name}.npy"), mmap_mode="r")))
+        self.section_text = np.memmap(os.path.join(compiled_dir, "sections.bin"), dtype=np.uint8, mode="r")
+        self.terms = {term: term_id for term_id, term in enumerate(meta["terms"])}
+        self.sections = [tuple(section) for section in meta["sections"]]
+        self.corpus_tokens = meta["corpus_tokens"]
+
+    def _text(self, section_id: int) -> str:
+        start, end = self.text_offsets[section_id:section_id + 2].tolist()
+        return self.section_text[start:end].tobytes().decode("utf-8")
+
+    def search(self, query: str, top_k: int = ORDINANCE_TOP_K) -> List[Dict[str, Any]]:
+        if not self.ensure_loaded():
+            return []
+
+        start = time.perf_counter()
+        query_terms: Dict[int, int] = {}
+        for token in tokenize(query):
+            term_id = self.terms.get(token)
+            if term_id is not None:
+                query_terms[term_id] = query_terms.get(term_id, 0) + 1
+
+        results = []
+        if query_terms:
+            bounds = [self.term_offsets[term_id:term_id + 2].tolist() for term_id in query_terms]
+            section_ids = np.concatenate([self.posting_sections[lo:hi] for lo, hi in bounds])
+            weights = np.concatenate([self.posting_weights[lo:hi] * count for (lo, hi), count in zip(bounds, query_terms.values())])
+            scores = np.bincount(section_ids, weights=weights, minlength=len(self.sections))
+
+            k = min(top_k, int(np.count_nonzero(scores)))
+            if k:
+                best = np.argpartition(-scores, k - 1)[:k]
+                for section_id in best[np.argsort(-scores[best])].tolist():
+                    source, title = self.sections[section_id]
+                    results.append({"source": source, "title": title, "score": round(float(scores[section_id]), 3), "text": self._text(section_id)})
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.stats["searches"] += 1
+        self.stats["total_search_ms"] += elapsed_ms
+        self.stats["max_search_ms"] = max(self.stats["max_search_ms"], elapsed_ms)
+        return results
+
+    def prompt_context(self, query: str, top_k: int = ORDINANCE_TOP_K, max_tokens: int = ORDINANCE_CONTEXT_TOKENS) -> Optional[str]:
+        blocks, used = [], 0
+        for section in self.search(query, top_k):
+            block = f"[{section['source']}]\n{section['text'].strip()}"
+            tokens = estimate_tokens(block)
+            if blocks and used + tokens > max_tokens:
+                break
+            blocks.append(block)
+            used += tokens
+
+        if not blocks:
+            return None
+
+        self.stats["injected_tokens"] += used
+        self.stats["tokens_saved"] += max(0, self.corpus_tokens - used)
+        return "\n\n".join(blocks)
+
+    def get_stats(self) -> Dict[str, Any]:
+        searches = self.stats["searches"]
+        return {
+            "loaded": self._loaded,
+            "sections": len(self.sections),
+            "terms": len(self.terms),
+            "corpus_tokens": self.corpus_tokens,
+            **self.stats,
+            "total_search_ms": round(self.stats["total_search_ms"], 2),
+            "max_search_ms": round(self.stats["max_search_ms"], 3),
+            "avg_search_ms": round(self.stats["total_search_ms"] / searches, 3) if searches else 0.0
+        }
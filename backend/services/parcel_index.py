@@ -0,0 +1,222 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.cache import CACHE_DIR
+
+PARCEL_INDEX_PATH = os.getenv("PARCEL_INDEX_PATH", os.path.join(CACHE_DIR, "parcels.sqlite3"))
+
+PARCEL_ID_COLUMNS = ["parcel_id", "PARCEL_ID", "PARCELID", "PARCELNO", "PARCEL_NO", "PIN", "TAXKEY", "TAX_KEY", "APN"]
+ZONING_COLUMNS = ["zoning_district", "ZONING_DISTRICT", "ZONING", "zoning", "ZONE", "zone", "ZONE_CODE"]
+LOT_AREA_SQFT_COLUMNS = ["lot_area", "LOT_AREA", "LOT_SQFT", "LOTSIZE", "LOT_SIZE", "SQFT"]
+LOT_AREA_ACRES_COLUMNS = ["ACRES", "acres", "GIS_ACRES", "LOT_ACRES"]
+LAT_COLUMNS = ["lat", "LAT", "LATITUDE", "latitude", "CENTROID_Y", "Y"]
+LNG_COLUMNS = ["lng", "lon", "LON", "LNG", "LONGITUDE", "longitude", "CENTROID_X", "X"]
+DELETED_COLUMNS = ["deleted", "DELETED", "RETIRED"]
+
+SQFT_PER_ACRE = 43560
+BATCH_SIZE = 5000
+
+
+def normalize_parcel_id(parcel_id: str) -> str:
+    return re.sub(r"[\s\-./]", "", str(parcel_id)).upper()
+
+
+def _first(record: Dict[str, Any], columns: List[str]) -> Optional[Any]:
+    for column in columns:
+        value = record.get(column)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _ring_centroid(ring: List[List[float]]) -> Tuple[Optional[float], Optional[float]]:
+    area = cx = cy = 0.0
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]):
+        cross = x0 * y1 - x1 * y0
+        area += cross
+        cx += (x0 + x1) * cross
+        cy += (y0 + y1) * cross
+    if area == 0:
+        if not ring:
+            return None, None
+        return sum(p[1] for p in ring) / len(ring), sum(p[0] for p in ring) / len(ring)
+    return cy / (3 * area), cx / (3 * area)
+
+
+class ParcelIndex:
+    def __init__(self, path: str = PARCEL_INDEX_PATH):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS parcels ("
+                "parcel_id TEXT PRIMARY KEY, district TEXT NOT NULL, lot_area REAL, lat REAL, lng REAL"
+                ") WITHOUT ROWID"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS ingests ("
+                "source TEXT NOT NULL, digest TEXT PRIMARY KEY, rows INTEGER NOT NULL, ingested_at REAL NOT NULL)"
+            )
+        return self._db
+
+    def lookup(self, parcel_id: str) -> Optional[Dict[str, Any]]:
+        if self._db is None and not os.path.exists(self.path):
+            return None
+
+        row = self.db.execute(
+            "SELECT district, lot_area, lat, lng FROM parcels WHERE parcel_id = ?",
+            (normalize_parcel_id(parcel_id),)
+        ).fetchone()
+        if row is None:
+            return None
+
+        district, lot_area, lat, lng = row
+        return {
+            "district": district,
+            "lot_area": lot_area,
+            "centroid": {"lat": lat, "lng": lng} if lat is not None and lng is not None else None
+        }
+
+    def _file_digest(self, path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _iter_csv(self, path: str) -> Iterator[Dict[str, Any]]:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.DictReader(f)
+
+    def _iter_geojson(self, path: str) -> Iterator[Dict[str, Any]]:
+        with open(path) as f:
+            collection = json.load(f)
+
+        for feature in collection.get("features", []):
+            record = dict(feature.get("properties") or {})
+            geometry = feature.get("geometry") or {}
+            if _first(record, LAT_COLUMNS) is None:
+                if geometry.get("type") == "Point":
+                    record["lng"], record["lat"] = geometry["coordinates"][:2]
+                elif geometry.get("type") == "Polygon":
+                    record["lat"], record["lng"] = _ring_centroid(geometry["coordinates"][0])
+                elif geometry.get("type") == "MultiPolygon":
+                    largest = max(geometry["coordinates"], key=lambda polygon: len(polygon[0]))
+                    record["lat"], record["lng"] = _ring_centroid(largest[0])
+            yield record
+
+    def _rows(self, records: Iterable[Dict[str, Any]]) -> Iterator[Tuple[str, Optional[Tuple]]]:
+        for record in records:
+            parcel_id = _first(record, PARCEL_ID_COLUMNS)
+            if parcel_id is None:
+                continue
+
+            key = normalize_parcel_id(parcel_id)
+            if str(_first(record, DELETED_COLUMNS) or "").lower() in ("1", "true", "y", "yes"):
+                yield key, None
+                continue
+
+            district = _first(record, ZONING_COLUMNS)
+            if district is None:
+                continue
+
+            lot_area = _to_float(_first(record, LOT_AREA_SQFT_COLUMNS))
+            if lot_area is None:
+                acres = _to_float(_first(record, LOT_AREA_ACRES_COLUMNS))
+                lot_area = acres * SQFT_PER_ACRE if acres is not None else None
+
+            yield key, (key, str(district).strip(), lot_area,
+                        _to_float(_first(record, LAT_COLUMNS)), _to_float(_first(record, LNG_COLUMNS)))
+
+    def ingest(self, path: str, force: bool = False) -> Dict[str, Any]:
+        digest = self._file_digest(path)
+        if not force and self.db.execute("SELECT 1 FROM ingests WHERE digest = ?", (digest,)).fetchone():
+            return {"source": path, "skipped": True, "upserted": 0, "deleted": 0}
+
+        records = self._iter_geojson(path) if path.lower().endswith((".geojson", ".json")) else self._iter_csv(path)
+        upserts, deletes = [], []
+        counts = {"upserted": 0, "deleted": 0}
+
+        def flush():
+            if upserts:
+                self.db.executemany(
+                    "INSERT INTO parcels VALUES (?, ?, ?, ?, ?) ON CONFLICT (parcel_id) DO UPDATE SET "
+                    "district = excluded.district, "
+                    "lot_area = COALESCE(excluded.lot_area, parcels.lot_area), "
+                    "lat = COALESCE(excluded.lat, parcels.lat), "
+                    "lng = COALESCE(excluded.lng, parcels.lng)",
+                    upserts
+                )
+                counts["upserted"] += len(upserts)
+                upserts.clear()
+            if deletes:
+                self.db.executemany("DELETE FROM parcels WHERE parcel_id = ?", deletes)
+                counts["deleted"] += len(deletes)
+                deletes.clear()
+
+        self.db.execute("BEGIN")
+        try:
+            for key, row in self._rows(records):
+                if (row is None and upserts) or (row is not None and deletes):
+                    flush()
+                if row is None:
+                    deletes.append((key,))
+                else:
+                    upserts.append(row)
+                if len(upserts) + len(deletes) >= BATCH_SIZE:
+                    flush()
+            flush()
+            self.db.execute(
+                "INSERT OR REPLACE INTO ingests VALUES (?, ?, ?, ?)",
+                (os.path.basename(path), digest, counts["upserted"] + counts["deleted"], time.time())
+            )
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+
+        return {"source": path, "skipped": False, **counts}
+
+    def get_stats(self) -> Dict[str, Any]:
+        if self._db is None and not os.path.exists(self.path):
+            return {"parcels": 0, "ingests": 0}
+        return {
+            "parcels": self.db.execute("SELECT COUNT(*) FROM parcels").fetchone()[0],
+            "ingests": self.db.execute("SELECT COUNT(*) FROM ingests").fetchone()[0]
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest county parcel dumps (CSV or GeoJSON) into the parcel index")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--index", default=PARCEL_INDEX_PATH)
+    parser.add_argument("--force", action="store_true", help="re-ingest files that were already loaded")
+    args = parser.parse_args()
+
+    index = ParcelIndex(args.index)
+    for file_path in args.files:
+        start = time.perf_counter()
+        result = index.ingest(file_path, force=args.force)
+        status = "already ingested" if result["skipped"] else f"{result['upserted']} upserted, {result['deleted']} deleted"
+        print(f"{file_path}: {status} in {time.perf_counter() - start:.1f}s")
+    print(f"index now holds {index.get_stats()['parcels']} parcels")
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from models.project import PermitPackageRequest, VisualRequest
+from utils.package_store import PackageStore
+
+logger = logging.getLogger(__name__)
+
+
+class PermitPackagePipeline:
+    def __init__(self, ai_service, zoning_service, export_service, package_store: Optional[PackageStore] = None):
+        self.ai_service = ai_service
+        self.zoning_service = zoning_service
+        self.export_service = export_service
+        self.package_store = package_store or PackageStore()
+
+    def claim_package(self, package_id: str) -> Optional[Tuple[str, str]]:
+        return self.package_store.claim(package_id)
+
+    async def run(self, package_request: PermitPackageRequest) -> AsyncIterator[Dict[str, Any]]:
+        project_data = package_request.project
+        bypass_cache = package_request.bypass_cache
+        events: asyncio.Queue = asyncio.Queue()
+        started = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+
+        def elapsed_ms() -> float:
+            return round((time.perf_counter() - started) * 1000, 1)
+
+        async def run_stage(name: str, depends_on: List[str], fn: Callable[..., Awaitable[Any]]) -> Any:
+            upstream = [await tasks[dependency] for dependency in depends_on]
+            if any(result is None for result in upstream):
+                await events.put({"stage": name, "status": "skipped", "elapsed_ms": elapsed_ms()})
+                return None
+
+            await events.put({"stage": name, "status": "started", "elapsed_ms": elapsed_ms()})
+            try:
+                result, payload = await fn(*upstream)
+            except Exception as e:
+                logger.warning("Pipeline stage %s error: %s", name, e)
+                await events.put({"stage": name, "status": "error", "error": str(e), "elapsed_ms": elapsed_ms()})
+                return None
+
+            await events.put({"stage": name, "status": "completed", "result": payload, "elapsed_ms": elapsed_ms()})
+            return result
+
+        async def zoning():
+            zoning_info = await self.zoning_service.get_zoning_info(project_data.address, project_data.parcel_id)
+            return zoning_info, zoning_info
+
+        async def feasibility(zoning_info):
+            result = await self.ai_service.analyze_feasibility(project_data, zoning_info, bypass_cache=bypass_cache)
+            return result, result.model_dump()
+
+        async def narrative():
+            text = await self.ai_service.generate_construction_narrative(project_data, bypass_cache=bypass_cache)
+            result = {
+                "narrative": text,
+                "word_count": len(text.split()),
+                "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+            }
+            return result, result
+
+        def visual(visual_type: str):
+            async def generate():
+                result = await self.ai_service.generate_visual(VisualRequest(
+                    structure_type=project_data.structure_type,
+                    dimensions=project_data.dimensions,
+                    materials=project_data.materials,
+                    visual_type=visual_type,
+                    address=project_data.address,
+                    location_on_lot=project_data.location_on_lot
+                ))
+                if result["status"] != "success":
+                    raise RuntimeError(result.get("error") or "Visual generation failed")
+                return result, result
+            return generate
+
+        async def export():
+            export_data = {
+                "type": package_request.export_type,
+                "project_data": project_data.model_dump(),
+                "feasibility_results": tasks["feasibility"].result().model_dump() if tasks["feasibility"].result() else {},
+                "narrative_results": tasks["narrative"].result() or {}
+            }
+            path = await asyncio.to_thread(self.export_service.create_document, export_data, package_request.export_type)
+            package_id = await asyncio.to_thread(self.package_store.put, path, package_request.export_type)
+            return package_id, {"package_id": package_id, "download_url": f"/api/permit-package/{package_id}"}
+
+        # Deduplicated so a repeated type cannot start a second, orphaned task under the same key.
+        visual_stages = [f"visual:{visual_type}" for visual_type in dict.fromkeys(package_request.visual_types)]
+        stages = [
+            ("zoning", [], zoning),
+            ("feasibility", ["zoning"], feasibility),
+            ("narrative", [], narrative),
+            *[(name, [], visual(name.split(":", 1)[1])) for name in visual_stages]
+        ]
+        for name, depends_on, fn in stages:
+            tasks[name] = asyncio.create_task(run_stage(name, depends_on, fn))
+
+        # The export only contains feasibility and narrative, so it does not wait for the
+        # visuals; they keep streaming their own events until the pipeline completes.
+        async def export_when_ready():
+            await asyncio.gather(tasks["feasibility"], tasks["narrative"])
+            return await run_stage("export", [], export)
+
+        final = asyncio.create_task(export_when_ready())
+        everything = asyncio.gather(final, *tasks.values())
+        try:
+            while not (everything.done() and events.empty()):
+                getter = asyncio.create_task(events.get())
+                await asyncio.wait({getter, everything}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    yield getter.result()
+                else:
+                    getter.cancel()
+
+            yield {
+                "stage": "pipeline",
+                "status": "completed" if final.result() else "error",
+                "package_id": final.result(),
+                "download_url": f"/api/permit-package/{final.result()}" if final.result() else None,
+                "elapsed_ms": elapsed_ms()
+            }
+        finally:
+            for task in [*tasks.values(), final]:
+                if not task.done():
+                    task.cancel()
@@ -0,0 +1,76 @@
+import re
+from typing import Dict, List, Optional, Tuple, Union
+
+from models.project import ReviewResults, ReviewIssue, ReviewFix
+
+RISK_ORDER = {"low": 0, "medium": 1, "high": 2}
+SEVERITY_ORDER = {"low": 0, "medium": 1, "high": 2, "critical": 3}
+COMPLIANCE_ORDER = {"pass": 0, "warning": 1, "fail": 2}
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^a-z0-9 ]+", "", re.sub(r"\s+", " ", text.lower())).strip()
+
+
+def _rank(value: Optional[str], order: Dict[str, int]) -> int:
+    return order.get((value or "").strip().lower(), -1)
+
+
+def _merge_items(
+    groups: List[List[Union[ReviewIssue, ReviewFix, str]]], level_field: str, order: Dict[str, int]
+) -> List[Union[ReviewIssue, ReviewFix, str]]:
+    merged: Dict[str, Union[ReviewIssue, ReviewFix, str]] = {}
+    for items in groups:
+        for item in items:
+            description = item if isinstance(item, str) else item.description
+            key = _normalize(description)
+            if not key:
+                continue
+            existing = merged.get(key)
+            if existing is None or (
+                not isinstance(item, str) and
+                (isinstance(existing, str) or _rank(getattr(item, level_field), order) > _rank(getattr(existing, level_field), order))
+            ):
+                merged[key] = item
+    return list(merged.values())
+
+
+def merge_review_results(partials: List[Tuple[str, ReviewResults]], failed_labels: List[str]) -> ReviewResults:
+    results = [result for _, result in partials]
+    worst_label, worst = max(partials, key=lambda partial: _rank(partial[1].rejection_risk, RISK_ORDER))
+
+    # A document is only missing if no chunk saw it; a compliance failure found on any
+    # chunk outweighs passes from chunks that did not cover the relevant pages.
+    missing_votes: Dict[str, int] = {}
+    missing_names: Dict[str, str] = {}
+    for result in results:
+        for document in result.missing_documents:
+            missing_names.setdefault(_normalize(document), document)
+        for key in {_normalize(document) for document in result.missing_documents}:
+            missing_votes[key] = missing_votes.get(key, 0) + 1
+    missing_documents = [missing_names[key] for key, votes in missing_votes.items() if key and votes == len(results)]
+
+    compliance_check: Dict[str, str] = {}
+    for result in results:
+        for category, status in result.compliance_check.items():
+            current = compliance_check.get(category)
+            if current is None or _rank(status, COMPLIANCE_ORDER) > _rank(current, COMPLIANCE_ORDER):
+                compliance_check[category] = status
+
+    issues = _merge_items([result.issues for result in results], "severity", SEVERITY_ORDER)
+    for label in failed_labels:
+        issues.append(ReviewIssue(category="Review Coverage", description=f"The content on {label} could not be analyzed", severity="Medium"))
+
+    scores = [result.confidence_score for result in results if result.confidence_score is not None]
+    assessments = [f"{label.capitalize()}: {result.overall_assessment}" for label, result in partials if result.overall_assessment]
+
+    return ReviewResults(
+        rejection_risk=worst.rejection_risk,
+        confidence_score=min(scores) if scores else None,
+        risk_summary=worst.risk_summary or f"Highest risk found on {worst_label}",
+        overall_assessment="\n".join(assessments) or None,
+        issues=issues,
+        fixes=_merge_items([result.fixes for result in results], "priority", SEVERITY_ORDER),
+        missing_documents=missing_documents,
+        compliance_check=compliance_check
+    )
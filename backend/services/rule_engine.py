@@ -0,0 +1,359 @@
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from models.project import ProjectData, FeasibilityResults, RuleCheck, ZoningInfo
+
+AUTHORITATIVE_ZONING_SOURCES = {"municipal_api", "local_index", "parcel_index"}
+SETBACK_SIDES = ("front", "rear", "side")
+KNOWN_STRUCTURE_TYPES = frozenset({
+    "single_family", "duplex", "multi_family", "garage", "shed", "deck",
+    "retail", "office", "restaurant", "warehouse", "manufacturing"
+})
+STRUCTURE_ALIASES = {
+    "detached_garage": "garage",
+    "attached_garage": "garage",
+    "storage_shed": "shed",
+    "house": "single_family",
+    "single_family_home": "single_family",
+    "apartment": "multi_family",
+}
+
+# A measurement only counts when it carries an explicit unit: a bare number could be
+# stories, millimeters or a count, and the engine must not guess.
+FEET_UNIT = r"(?:'|ft\b\.?|feet\b|foot\b)"
+INCH_UNIT = r"(?:\"|in\.|inch(?:es)?\b|in\b(?=\s*(?:$|[,;)x×])))"
+FEET_PATTERN = re.compile(
+    rf"(?<![\d.])(?P<feet>\d+(?:\.\d+)?)\s*{FEET_UNIT}(?:\s*(?P<inches>\d+(?:\.\d+)?)\s*{INCH_UNIT})?", re.I
+)
+INCHES_PATTERN = re.compile(rf"(?<![\d.])(?P<inches>\d+(?:\.\d+)?)\s*{INCH_UNIT}", re.I)
+METERS_PATTERN = re.compile(r"(?<![\d.])(?P<meters>\d+(?:\.\d+)?)\s*(?:m|meters?|metres?)\b", re.I)
+# Setbacks are only read from phrases that name a lot line or a setback, never from
+# distances to the house or other structures.
+DISTANCE = rf"(?P<distance>\d+(?:\.\d+)?)\s*{FEET_UNIT}"
+SIDE = r"(?P<side>front|rear|back|side)"
+SETBACK_PATTERNS = (
+    re.compile(rf"(?<![\d.]){DISTANCE}\s*(?:from|to|off)\s+(?:the\s+)?{SIDE}\s+(?:lot|property)\s+line\b", re.I),
+    re.compile(rf"(?<![\d.]){DISTANCE}\s+{SIDE}\s+(?:yard\s+)?setback\b", re.I),
+    re.compile(rf"\b{SIDE}\s+(?:yard\s+)?setback\s*(?:of|is|:|=)?\s*{DISTANCE}", re.I),
+)
+DIMENSION_FIELDS = ("length", "width", "height")
+
+Check = Callable[[Dict[str, Any]], Optional[RuleCheck]]
+
+
+# Returns None unless the value is a number or text with an explicit unit.
+def parse_feet(value: Optional[Union[str, float]]) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    metric = METERS_PATTERN.search(value)
+    if metric:
+        return round(float(metric.group("meters")) * 3.28084, 2)
+
+    match = FEET_PATTERN.search(value)
+    if match:
+        feet = float(match.group("feet"))
+        if match.group("inches"):
+            feet += float(match.group("inches")) / 12
+        return feet
+
+    inches = INCHES_PATTERN.search(value)
+    if inches:
+        return round(float(inches.group("inches")) / 12, 2)
+    return None
+
+
+def parse_setbacks(text: str) -> Dict[str, float]:
+    setbacks: Dict[str, float] = {}
+    for pattern in SETBACK_PATTERNS:
+        for match in pattern.finditer(text):
+            side = "rear" if match.group("side").lower() == "back" else match.group("side").lower()
+            distance = float(match.group("distance"))
+            setbacks[side] = min(distance, setbacks.get(side, distance))
+    return setbacks
+
+
+def normalize_structure_type(structure_type: str) -> str:
+    normalized = re.sub(r"[^a-z0-9]+", "_", structure_type.lower()).strip("_")
+    return STRUCTURE_ALIASES.get(normalized, normalized)
+
+
+class RuleEvaluation:
+    def __init__(self, checks: List[RuleCheck], zoning_info: Dict[str, Any], unreadable: Optional[Dict[str, str]] = None):
+        self.checks = checks
+        self.zoning_info = zoning_info
+        # Dimension fields that had text but no number with a unit.
+        self.unreadable = unreadable or {}
+
+    @property
+    def failures(self) -> List[RuleCheck]:
+        return [check for check in self.checks if check.status == "fail"]
+
+    @property
+    def unknowns(self) -> List[RuleCheck]:
+        return [check for check in self.checks if check.status == "unknown"]
+
+    @property
+    def is_conclusive(self) -> bool:
+        if self.zoning_info.get("source") not in AUTHORITATIVE_ZONING_SOURCES:
+            return False
+        # Every value a check can fail on is a structured field or a measurement with
+        # an explicit unit. If part of the input could not be read that way, the checks
+        # go to the LLM as context instead of being the answer.
+        if self.unreadable:
+            return False
+        if self.failures:
+            return True
+
+        evaluated = {check.rule for check in self.checks}
+        has_setback = any(rule.startswith("min_setback_") for rule in evaluated)
+        return not self.unknowns and {"allowed_structures", "max_height"} <= evaluated and has_setback
+
+    @property
+    def verdict(self) -> str:
+        if any(check.rule == "allowed_structures" for check in self.failures):
+            return "Not Feasible"
+        if self.failures:
+            return "Needs Variance"
+        return "Feasible"
+
+    def summary_lines(self) -> List[str]:
+        lines = [f"[{check.status.upper()}] {check.rule}: {check.detail}" for check in self.checks]
+        lines.extend(f"[UNREAD] {field}: '{text}' has no measurement with a unit" for field, text in self.unreadable.items())
+        return lines
+
+    def to_results(self) -> FeasibilityResults:
+        verdict = self.verdict
+        district = self.zoning_info.get("district")
+        issues = [check.detail for check in self.failures]
+
+        if verdict == "Feasible":
+            summary = f"The project meets every checked {district} zoning requirement: structure type, height and stated setbacks."
+            recommendations = ["Confirm setbacks on a site plan drawn to scale before submitting"]
+        else:
+            summary = f"The project does not meet {len(issues)} {district} zoning requirement(s): " + "; ".join(issues) + "."
+            recommendations = [check.remedy for check in self.failures if check.remedy]
+
+        required_permits = ["Building Permit", "Zoning Permit"]
+        if verdict == "Needs Variance":
+            required_permits.append("Zoning Variance")
+        elif verdict == "Not Feasible":
+            required_permits.append("Conditional Use Permit or Rezoning")
+
+        return FeasibilityResults(
+            verdict=verdict,
+            confidence_score=95 if self.failures else 85,
+            compliance_summary=summary,
+            zoning_info=ZoningInfo(
+                district=district or "Unknown",
+                classification=self.zoning_info.get("classification", "Unknown"),
+                restrictions=self.zoning_info.get("restrictions", [])
+            ),
+            issues=issues,
+            recommendations=recommendations,
+            required_permits=required_permits,
+            rule_checks=self.checks,
+            decided_by="rules"
+        )
+
+
+PASS, FAIL, UNKNOWN, SKIP = "pass", "fail", "unknown", None
+
+
+def structure_result(status: Optional[str], structure: str, allowed: List[str]) -> Optional[RuleCheck]:
+    if status == PASS:
+        return RuleCheck(rule="allowed_structures", status=PASS, detail=f"'{structure}' is permitted in this district")
+    if status == FAIL:
+        return RuleCheck(
+            rule="allowed_structures", status=FAIL,
+            detail=f"'{structure}' is not a permitted structure type (allowed: {', '.join(allowed)})",
+            remedy="Apply for a conditional use permit or rezoning, or choose a permitted structure type"
+        )
+    if status == UNKNOWN:
+        return RuleCheck(rule="allowed_structures", status=UNKNOWN, detail=f"'{structure}' is not covered by the district's structure list")
+    return None
+
+
+def height_result(status: Optional[str], height: Optional[float], max_height: float) -> Optional[RuleCheck]:
+    if status == PASS:
+        return RuleCheck(rule="max_height", status=PASS, detail=f"Height {height:g} ft is within the {max_height:g} ft limit")
+    if status == FAIL:
+        return RuleCheck(
+            rule="max_height", status=FAIL,
+            detail=f"Height {height:g} ft exceeds the {max_height:g} ft limit by {height - max_height:g} ft",
+            remedy=f"Reduce the structure height to {max_height:g} ft or less, or request a height variance"
+        )
+    if status == UNKNOWN:
+        return RuleCheck(rule="max_height", status=UNKNOWN, detail="Structure height was not given in feet, inches or meters")
+    return None
+
+
+def setback_result(status: Optional[str], side: str, distance: float, minimum: float) -> Optional[RuleCheck]:
+    rule = f"min_setback_{side}"
+    if status == PASS:
+        return RuleCheck(rule=rule, status=PASS, detail=f"{side.capitalize()} setback {distance:g} ft meets the {minimum:g} ft minimum")
+    if status == FAIL:
+        return RuleCheck(
+            rule=rule, status=FAIL,
+            detail=f"{side.capitalize()} setback {distance:g} ft is less than the {minimum:g} ft minimum",
+            remedy=f"Move the structure at least {minimum:g} ft from the {side} lot line, or request a setback variance"
+        )
+    return None
+
+
+def coverage_result(status: Optional[str], coverage: float, max_coverage: float) -> Optional[RuleCheck]:
+    if status == PASS:
+        return RuleCheck(
+            rule="max_lot_coverage", status=PASS,
+            detail=f"New footprint covers {coverage:.0%} of the lot (limit {max_coverage:.0%}, excluding existing structures)"
+        )
+    if status == FAIL:
+        return RuleCheck(
+            rule="max_lot_coverage", status=FAIL,
+            detail=f"New footprint alone covers {coverage:.0%} of the lot, above the {max_coverage:.0%} limit",
+            remedy="Reduce the structure footprint or request a lot coverage variance"
+        )
+    return None
+
+
+def structure_status(structure: str, allowed: List[str]) -> str:
+    if structure in allowed:
+        return PASS
+    if structure in KNOWN_STRUCTURE_TYPES:
+        return FAIL
+    return UNKNOWN
+
+
+class FeasibilityRuleEngine:
+    def __init__(self):
+        self._compiled: Dict[Tuple, List[Check]] = {}
+
+    def _compile(self, rules: Dict[str, Any]) -> List[Check]:
+        key = tuple(sorted((name, tuple(value) if isinstance(value, list) else value) for name, value in rules.items()))
+        compiled = self._compiled.get(key)
+        if compiled is not None:
+            return compiled
+
+        compiled = []
+        if "allowed_structures" in rules:
+            compiled.append(self._structure_check(rules["allowed_structures"]))
+        if "max_height" in rules:
+            compiled.append(self._height_check(rules["max_height"]))
+        for side in SETBACK_SIDES:
+            if f"min_setback_{side}" in rules:
+                compiled.append(self._setback_check(side, rules[f"min_setback_{side}"]))
+        if "max_lot_coverage" in rules:
+            compiled.append(self._coverage_check(rules["max_lot_coverage"]))
+
+        self._compiled[key] = compiled
+        return compiled
+
+    def _structure_check(self, allowed: List[str]) -> Check:
+        allowed_set = frozenset(allowed)
+
+        def check(facts: Dict[str, Any]) -> Optional[RuleCheck]:
+            structure = facts["structure_type"]
+            return structure_result(structure_status(structure, allowed_set), structure, allowed)
+        return check
+
+    def _height_check(self, max_height: float) -> Check:
+        def check(facts: Dict[str, Any]) -> Optional[RuleCheck]:
+            height = facts["height"]
+            if height is None:
+                return height_result(UNKNOWN, None, max_height)
+            return height_result(PASS if height <= max_height else FAIL, height, max_height)
+        return check
+
+    def _setback_check(self, side: str, minimum: float) -> Check:
+        def check(facts: Dict[str, Any]) -> Optional[RuleCheck]:
+            distance = facts["setbacks"].get(side)
+            if distance is None:
+                return None
+            return setback_result(PASS if distance >= minimum else FAIL, side, distance, minimum)
+        return check
+
+    def _coverage_check(self, max_coverage: float) -> Check:
+        def check(facts: Dict[str, Any]) -> Optional[RuleCheck]:
+            footprint, lot_area = facts["footprint"], facts["lot_area"]
+            if footprint is None or not lot_area:
+                return None
+            coverage = footprint / lot_area
+            return coverage_result(PASS if coverage <= max_coverage else FAIL, coverage, max_coverage)
+        return check
+
+    def extract_facts(self, project_data: ProjectData, zoning_info: Dict[str, Any]) -> Dict[str, Any]:
+        length = parse_feet(project_data.dimensions.length)
+        width = parse_feet(project_data.dimensions.width)
+
+        height = parse_feet(project_data.dimensions.height)
+        parsed = {"length": length, "width": width, "height": height}
+        unreadable = {
+            field: str(getattr(project_data.dimensions, field)) for field in DIMENSION_FIELDS
+            if parsed[field] is None and getattr(project_data.dimensions, field) not in (None, "")
+        }
+
+        return {
+            "structure_type": normalize_structure_type(project_data.structure_type),
+            "height": height,
+            "footprint": length * width if length is not None and width is not None else None,
+            "lot_area": zoning_info.get("lot_area"),
+            "setbacks": parse_setbacks(project_data.location_on_lot or ""),
+            "unreadable": unreadable
+        }
+
+    def evaluate(self, project_data: ProjectData, zoning_info: Dict[str, Any]) -> RuleEvaluation:
+        facts = self.extract_facts(project_data, zoning_info)
+        checks = [check(facts) for check in self._compile(zoning_info.get("rules") or {})]
+        return RuleEvaluation([check for check in checks if check is not None], zoning_info, facts["unreadable"])
+
+    def evaluate_batch(self, projects: List[ProjectData], zoning_infos: List[Dict[str, Any]]) -> List[RuleEvaluation]:
+        facts = [self.extract_facts(project, zoning) for project, zoning in zip(projects, zoning_infos)]
+        rules = [zoning.get("rules") or {} for zoning in zoning_infos]
+
+        def column(values: Iterable[Optional[float]]) -> np.ndarray:
+            return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+        def status(applies: np.ndarray, passes: np.ndarray, unknown: Optional[np.ndarray] = None) -> np.ndarray:
+            statuses = np.where(passes, PASS, FAIL).astype(object)
+            if unknown is not None:
+                statuses[unknown] = UNKNOWN
+            statuses[~applies] = SKIP
+            return statuses
+
+        height = column(fact["height"] for fact in facts)
+        max_height = column(rule.get("max_height") for rule in rules)
+        with np.errstate(invalid="ignore"):
+            height_status = status(~np.isnan(max_height), height <= max_height, np.isnan(height))
+
+        setbacks, setback_status = {}, {}
+        for side in SETBACK_SIDES:
+            distance = column(fact["setbacks"].get(side) for fact in facts)
+            minimum = column(rule.get(f"min_setback_{side}") for rule in rules)
+            with np.errstate(invalid="ignore"):
+                setback_status[side] = status(~np.isnan(distance) & ~np.isnan(minimum), distance >= minimum)
+            setbacks[side] = (distance, minimum)
+
+        footprint = column(fact["footprint"] for fact in facts)
+        lot_area = column(fact["lot_area"] or None for fact in facts)
+        max_coverage = column(rule.get("max_lot_coverage") for rule in rules)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            coverage = footprint / lot_area
+            coverage_status = status(~np.isnan(coverage) & ~np.isnan(max_coverage), coverage <= max_coverage)
+
+        evaluations = []
+        for row, (fact, rule, zoning) in enumerate(zip(facts, rules, zoning_infos)):
+            checks = []
+            if "allowed_structures" in rule:
+                allowed = rule["allowed_structures"]
+                checks.append(structure_result(structure_status(fact["structure_type"], allowed), fact["structure_type"], allowed))
+            checks.append(height_result(height_status[row], fact["height"], max_height[row]))
+            for side in SETBACK_SIDES:
+                distance, minimum = setbacks[side]
+                checks.append(setback_result(setback_status[side][row], side, distance[row], minimum[row]))
+            checks.append(coverage_result(coverage_status[row], coverage[row], max_coverage[row]))
+            evaluations.append(RuleEvaluation([check for check in checks if check is not None], zoning, fact["unreadable"]))
+        return evaluations
@@ -0,0 +1,225 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DISTRICT_PROPERTY_KEYS = ["zoning_district", "ZONING_DISTRICT", "district", "DISTRICT", "zoning", "ZONING", "zone", "ZONE", "zone_code", "ZONE_CODE"]
+ARRAY_NAMES = ["vertices", "ring_offsets", "poly_ring_offsets", "bboxes", "poly_district", "cell_offsets", "cell_items"]
+
+
+class ZoningDistrictIndex:
+    def __init__(self, data_dir: str, cache_dir: str, target_polygons_per_cell: int = 4):
+        self.data_dir = data_dir
+        self.cache_dir = cache_dir
+        self.target_polygons_per_cell = target_polygons_per_cell
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.districts: List[str] = []
+        self.grid: Dict[str, float] = {}
+
+    def _source_files(self) -> List[str]:
+        return sorted(
+            glob.glob(os.path.join(self.data_dir, "*.geojson")) +
+            glob.glob(os.path.join(self.data_dir, "*.json"))
+        )
+
+    def _fingerprint(self, files: List[str]) -> str:
+        digest = hashlib.sha256()
+        for path in files:
+            stat = os.stat(path)
+            digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()[:16]
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    # Compiling a large district set takes seconds; async callers run this in a thread.
+    def ensure_loaded(self) -> bool:
+        if self._loaded:
+            return bool(self.districts)
+
+        with self._lock:
+            if self._loaded:
+                return bool(self.districts)
+
+            files = self._source_files() if os.path.isdir(self.data_dir) else []
+            if files:
+                compiled_dir = os.path.join(self.cache_dir, self._fingerprint(files))
+                if not os.path.exists(os.path.join(compiled_dir, "meta.json")):
+                    self._compile(files, compiled_dir)
+                self._load_compiled(compiled_dir)
+            self._loaded = True
+            return bool(self.districts)
+
+    def _iter_polygons(self, files: List[str]) -> Iterable[Tuple[str, List[List[List[float]]]]]:
+        for path in files:
+            with open(path) as f:
+                collection = json.load(f)
+
+            for feature in collection.get("features", []):
+                geometry = feature.get("geometry") or {}
+                properties = feature.get("properties") or {}
+                district = next((str(properties[key]) for key in DISTRICT_PROPERTY_KEYS if properties.get(key)), None)
+                if not district:
+                    continue
+
+                if geometry.get("type") == "Polygon":
+                    yield district, geometry["coordinates"]
+                elif geometry.get("type") == "MultiPolygon":
+                    for polygon in geometry["coordinates"]:
+                        yield district, polygon
+
+    def _compile(self, files: List[str], compiled_dir: str):
+        vertices, ring_offsets, poly_ring_offsets, bboxes, poly_district = [], [0], [0], [], []
+        district_ids: Dict[str, int] = {}
+        vertex_count = 0
+
+        for district, rings in self._iter_polygons(files):
+            ring_arrays = [self._closed_ring(ring) for ring in rings if len(ring) >= 3]
+            if not ring_arrays:
+                continue
+
+            for ring in ring_arrays:
+                vertices.append(ring)
+                vertex_count += len(ring)
+                ring_offsets.append(vertex_count)
+            poly_ring_offsets.append(len(ring_offsets) - 1)
+
+            outer = ring_arrays[0]
+            bboxes.append([outer[:, 0].min(), outer[:, 1].min(), outer[:, 0].max(), outer[:, 1].max()])
+            poly_district.append(district_ids.setdefault(district, len(district_ids)))
+
+        # An empty compile still writes meta.json, so it is not retried on every start.
+        if not bboxes:
+            self._write_compiled(compiled_dir, {}, {"districts": [], "grid": {}})
+            return
+
+        bboxes_array = np.asarray(bboxes, dtype=np.float64)
+        arrays = {
+            "vertices": np.concatenate(vertices),
+            "ring_offsets": np.asarray(ring_offsets, dtype=np.int64),
+            "poly_ring_offsets": np.asarray(poly_ring_offsets, dtype=np.int64),
+            "bboxes": bboxes_array,
+            "poly_district": np.asarray(poly_district, dtype=np.int32),
+        }
+        grid, arrays["cell_offsets"], arrays["cell_items"] = self._build_grid(bboxes_array)
+
+        self._write_compiled(compiled_dir, arrays, {"districts": list(district_ids), "grid": grid})
+
+    # Writes into a temporary directory and renames it into place, so a crash mid-compile
+    # never leaves a partial index that a later start would load.
+    def _write_compiled(self, compiled_dir: str, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".compile-", dir=self.cache_dir)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(staging, f"{name}.npy"), array)
+            with open(os.path.join(staging, "meta.json"), "w") as f:
+                json.dump(meta, f)
+
+            if os.path.isdir(compiled_dir):
+                shutil.rmtree(compiled_dir)
+            os.replace(staging, compiled_dir)
+        finally:
+            if os.path.isdir(staging):
+                shutil.rmtree(staging, ignore_errors=True)
+
+    def _closed_ring(self, ring: List[List[float]]) -> np.ndarray:
+        array = np.asarray(ring, dtype=np.float64)[:, :2]
+        if not np.array_equal(array[0], array[-1]):
+            array = np.vstack([array, array[:1]])
+        return array
+
+    def _build_grid(self, bboxes: np.ndarray) -> Tuple[Dict[str, float], np.ndarray, np.ndarray]:
+        min_x, min_y = bboxes[:, 0].min(), bboxes[:, 1].min()
+        max_x, max_y = bboxes[:, 2].max(), bboxes[:, 3].max()
+        cells_per_side = max(1, int(np.sqrt(len(bboxes) / self.target_polygons_per_cell)))
+        cell_w = max((max_x - min_x) / cells_per_side, 1e-9)
+        cell_h = max((max_y - min_y) / cells_per_side, 1e-9)
+
+        x0 = np.clip(((bboxes[:, 0] - min_x) / cell_w).astype(np.int64), 0, cells_per_side - 1)
+        x1 = np.clip(((bboxes[:, 2] - min_x) / cell_w).astype(np.int64), 0, cells_per_side - 1)
+        y0 = np.clip(((bboxes[:, 1] - min_y) / cell_h).astype(np.int64), 0, cells_per_side - 1)
+        y1 = np.clip(((bboxes[:, 3] - min_y) / cell_h).astype(np.int64), 0, cells_per_side - 1)
+
+        cells, items = [], []
+        for polygon_id in range(len(bboxes)):
+            for cx in range(x0[polygon_id], x1[polygon_id] + 1):
+                for cy in range(y0[polygon_id], y1[polygon_id] + 1):
+                    cells.append(cy * cells_per_side + cx)
+                    items.append(polygon_id)
+
+        cells_array = np.asarray(cells, dtype=np.int64)
+        order = np.argsort(cells_array, kind="stable")
+        cell_items = np.asarray(items, dtype=np.int32)[order]
+        cell_offsets = np.zeros(cells_per_side * cells_per_side + 1, dtype=np.int64)
+        np.add.at(cell_offsets, cells_array + 1, 1)
+        np.cumsum(cell_offsets, out=cell_offsets)
+
+        grid = {"min_x": float(min_x), "min_y": float(min_y), "cell_w": float(cell_w), "cell_h": float(cell_h), "n": cells_per_side}
+        return grid, cell_offsets, cell_items
+
+    def _load_compiled(self, compiled_dir: str):
+        meta_path = os.path.join(compiled_dir, "meta.json")
+        if not os.path.exists(meta_path):
+            return
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if not meta["districts"]:
+            return
+
+        for name in ARRAY_NAMES:
+            setattr(self, name, np.asarray(np.load(os.path.join(compiled_dir, f"{name}.npy"), mmap_mode="r")))
+        self.grid = meta["grid"]
+        self.districts = meta["districts"]
+
+    def _point_in_polygon(self, polygon_id: int, x: float, y: float) -> bool:
+        inside = False
+        first_ring, last_ring = self.poly_ring_offsets[polygon_id:polygon_id + 2].tolist()
+        ring_bounds = self.ring_offsets[first_ring:last_ring + 1].tolist()
+        for start, end in zip(ring_bounds, ring_bounds[1:]):
+            ring = self.vertices[start:end]
+            xi, yi = ring[:-1, 0], ring[:-1, 1]
+            xj, yj = ring[1:, 0], ring[1:, 1]
+            straddles = (yi > y) != (yj > y)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                x_cross = (xj - xi) * (y - yi) / (yj - yi) + xi
+            if np.count_nonzero(straddles & (x < x_cross)) % 2:
+                inside = not inside
+        return inside
+
+    def lookup(self, lat: float, lng: float) -> Optional[str]:
+        if not self.ensure_loaded():
+            return None
+
+        grid = self.grid
+        x = (lng - grid["min_x"]) / grid["cell_w"]
+        y = (lat - grid["min_y"]) / grid["cell_h"]
+        if not (0 <= x <= grid["n"] and 0 <= y <= grid["n"]):
+            return None
+        # A point exactly on the max bound belongs to the last cell.
+        cx, cy = min(int(x), grid["n"] - 1), min(int(y), grid["n"] - 1)
+
+        cell = cy * grid["n"] + cx
+        candidates = self.cell_items[self.cell_offsets[cell]:self.cell_offsets[cell + 1]]
+        boxes = self.bboxes[candidates]
+        in_box = (boxes[:, 0] <= lng) & (lng <= boxes[:, 2]) & (boxes[:, 1] <= lat) & (lat <= boxes[:, 3])
+        for polygon_id in candidates[in_box].tolist():
+            if self._point_in_polygon(polygon_id, lng, lat):
+                return self.districts[self.poly_district[polygon_id]]
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self._loaded,
+            "polygons": int(len(self.bboxes)) if self.districts else 0,
+            "districts": len(self.districts)
+        }
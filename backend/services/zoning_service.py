@@ -1,12 +1,62 @@
-import requests
+import httpx
+import logging
 import os
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any, AsyncIterator, Tuple
 import asyncio
 import json
+import re
+import time
+from utils.http_client import HTTPClient, get_http_client
+from utils.cache import TieredCache, CACHE_DIR
+from utils.circuit_breaker import CircuitBreaker
+from utils.single_flight import SingleFlight
+from services.zoning_index import ZoningDistrictIndex
+from services.parcel_index import ParcelIndex, normalize_parcel_id
+
+logger = logging.getLogger(__name__)
+
+ZONING_DATA_DIR = os.getenv("ZONING_DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "zoning"))
+
+GEOCODE_TTL = int(os.getenv("GEOCODE_CACHE_TTL", str(90 * 24 * 3600)))
+GEOCODE_STALE_TTL = int(os.getenv("GEOCODE_CACHE_STALE_TTL", str(30 * 24 * 3600)))
+ZONING_TTLS = {
+    "municipal_api": int(os.getenv("ZONING_CACHE_TTL", str(7 * 24 * 3600))),
+}
+ZONING_STALE_TTL = int(os.getenv("ZONING_CACHE_STALE_TTL", str(7 * 24 * 3600)))
+
+GEOCODE_URL = os.getenv("GEOCODE_URL", "https://maps.googleapis.com/maps/api/geocode/json")
+CITY_APIS = {
+    "madison_wi": os.getenv("MADISON_ZONING_URL", "https://api.cityofmadison.com/zoning"),
+    "milwaukee_wi": os.getenv("MILWAUKEE_ZONING_URL", "https://api.milwaukee.gov/zoning"),
+}
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("ZONING_BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_RECOVERY_TIMEOUT = float(os.getenv("ZONING_BREAKER_RECOVERY_TIMEOUT", "60"))
+
+ADDRESS_ABBREVIATIONS = {
+    "street": "st", "avenue": "ave", "road": "rd", "drive": "dr", "boulevard": "blvd",
+    "lane": "ln", "court": "ct", "place": "pl", "terrace": "ter", "parkway": "pkwy",
+    "highway": "hwy", "north": "n", "south": "s", "east": "e", "west": "w",
+    "wisconsin": "wi", "suite": "ste", "apartment": "apt"
+}
 
 class ZoningService:
-    def __init__(self):
+    def __init__(self, http_client: Optional[HTTPClient] = None, cache: Optional[TieredCache] = None):
         self.google_maps_api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+        self.http_client = http_client or get_http_client()
+        self.cache = cache or TieredCache(os.path.join(CACHE_DIR, "zoning.sqlite3"))
+        self.parcel_index = ParcelIndex()
+        self.single_flight = SingleFlight()
+        self.district_index = ZoningDistrictIndex(ZONING_DATA_DIR, os.path.join(CACHE_DIR, "zoning_index"))
+        self.city_apis = dict(CITY_APIS)
+        self.breakers = {
+            city: CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RECOVERY_TIMEOUT)
+            for city in self.city_apis
+        }
+        self.endpoint_stats = {
+            city: {"requests": 0, "successes": 0, "errors": 0, "timeouts": 0, "cancelled": 0,
+                   "total_latency_ms": 0.0, "max_latency_ms": 0.0, "last_error": None}
+            for city in self.city_apis
+        }
         self.base_zoning_rules = self._load_base_zoning_rules()
     
     def _load_base_zoning_rules(self) -> Dict[str, Any]:
@@ -71,36 +121,81 @@ class ZoningService:
         if not address and not parcel_id:
             return self._get_default_zoning_info()
         
+        key = f"{normalize_parcel_id(parcel_id) if parcel_id else ''}|{self._normalize_address(address) if address else ''}"
+        return await self.single_flight.do("zoning", key, lambda: self._resolve_zoning_info(address, parcel_id))
+    
+    async def _resolve_zoning_info(self, address: Optional[str], parcel_id: Optional[str]) -> Dict[str, Any]:
         try:
-            if address:
-                coordinates = await self._geocode_address(address)
-                if coordinates:
-                    zoning_data = await self._lookup_zoning_by_coordinates(coordinates)
-                    if zoning_data:
-                        return zoning_data
-            
             if parcel_id:
                 zoning_data = await self._lookup_zoning_by_parcel(parcel_id)
                 if zoning_data:
                     return zoning_data
+            
+            if address:
+                zoning_data = await self.cache.get_or_fetch(
+                    "zoning", f"address:{self._normalize_address(address)}",
+                    lambda: self._resolve_zoning_by_address(address),
+                    self._zoning_cache_ttl, ZONING_STALE_TTL
+                )
+                if zoning_data:
+                    return zoning_data
         
         except Exception as e:
-            print(f"Error fetching zoning info: {e}")
+            logger.warning("Error fetching zoning info: %s", e)
         
         return self._get_default_zoning_info()
     
+    # Yields (index, zoning_info) pairs in groups as lookups finish, so callers can start
+    # on each project without waiting for the slowest geocode in the batch.
+    async def iter_zoning_info_many(
+        self, locations: List[Tuple[Optional[str], Optional[str]]], max_concurrency: int = 8
+    ) -> AsyncIterator[List[Tuple[int, Dict[str, Any]]]]:
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def resolve(index: int, address: Optional[str], parcel_id: Optional[str]) -> Tuple[int, Dict[str, Any]]:
+            async with semaphore:
+                return index, await self.get_zoning_info(address, parcel_id)
+        
+        pending = {asyncio.create_task(resolve(index, address, parcel_id)) for index, (address, parcel_id) in enumerate(locations)}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                yield [task.result() for task in done]
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _resolve_zoning_by_address(self, address: str) -> Optional[Dict[str, Any]]:
+        coordinates = await self.cache.get_or_fetch(
+            "geocode", self._normalize_address(address),
+            lambda: self._geocode_address(address),
+            lambda _: GEOCODE_TTL, GEOCODE_STALE_TTL
+        )
+        if coordinates:
+            return await self._lookup_zoning_by_coordinates(coordinates)
+        return None
+    
+    def _zoning_cache_ttl(self, zoning_data: Dict[str, Any]) -> int:
+        return ZONING_TTLS.get(zoning_data.get("source"), 0)
+    
+    def _normalize_address(self, address: str) -> str:
+        words = re.sub(r"[^\w\s]", " ", address.lower()).split()
+        return " ".join(ADDRESS_ABBREVIATIONS.get(word, word) for word in words)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        return self.cache.get_stats()
+    
     async def _geocode_address(self, address: str) -> Optional[Dict[str, float]]:
         if not self.google_maps_api_key:
             return None
         
         try:
-            url = "https://maps.googleapis.com/maps/api/geocode/json"
             params = {
                 "address": address,
                 "key": self.google_maps_api_key
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = await self.http_client.get(GEOCODE_URL, params=params)
             data = response.json()
             
             if data.get("status") == "OK" and data.get("results"):
@@ -111,39 +206,102 @@ class ZoningService:
                 }
         
         except Exception as e:
-            print(f"Geocoding error: {e}")
+            logger.warning("Geocoding error: %s", e)
         
         return None
     
     async def _lookup_zoning_by_coordinates(self, coordinates: Dict[str, float]) -> Optional[Dict[str, Any]]:
-        city_apis = {
-            "madison_wi": "https://api.cityofmadison.com/zoning",
-            "milwaukee_wi": "https://api.milwaukee.gov/zoning",
-        }
+        if not self.district_index.loaded:
+            await asyncio.to_thread(self.district_index.ensure_loaded)
+        district = self.district_index.lookup(coordinates["lat"], coordinates["lng"])
+        if district:
+            return self._build_zoning_info(district, "local_index")
         
-        for city, api_url in city_apis.items():
-            try:
-                params = {
-                    "lat": coordinates["lat"],
-                    "lng": coordinates["lng"],
-                    "format": "json"
-                }
-                
-                response = requests.get(api_url, params=params, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    return self._parse_zoning_api_response(data)
-            
-            except:
-                continue
+        tasks = [
+            asyncio.create_task(self._query_city_api(city, api_url, coordinates))
+            for city, api_url in self.city_apis.items()
+            if self.breakers[city].allow_request()
+        ]
+        
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                zoning_data = await next_result
+                if zoning_data:
+                    return zoning_data
+        finally:
+            for task in tasks:
+                task.cancel()
         
         return self._infer_zoning_from_coordinates(coordinates)
     
+    async def _query_city_api(self, city: str, api_url: str, coordinates: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        breaker = self.breakers[city]
+        stats = self.endpoint_stats[city]
+        params = {
+            "lat": coordinates["lat"],
+            "lng": coordinates["lng"],
+            "format": "json"
+        }
+        
+        stats["requests"] += 1
+        start = time.perf_counter()
+        try:
+            response = await self.http_client.get(api_url, params=params)
+            if response.status_code != 200:
+                raise httpx.HTTPStatusError(f"HTTP {response.status_code}", request=response.request, response=response)
+            data = response.json()
+            if not isinstance(data, dict) or not data.get("zoning_district"):
+                raise ValueError("response has no zoning_district")
+        
+        except asyncio.CancelledError:
+            stats["cancelled"] += 1
+            breaker.record_cancelled()
+            raise
+        
+        except (httpx.HTTPError, ValueError) as e:
+            stats["errors"] += 1
+            if isinstance(e, httpx.TimeoutException):
+                stats["timeouts"] += 1
+            stats["last_error"] = str(e)
+            breaker.record_failure()
+            logger.warning("Zoning API error (%s): %s", city, e)
+            return None
+        
+        finally:
+            latency_ms = (time.perf_counter() - start) * 1000
+            stats["total_latency_ms"] += latency_ms
+            stats["max_latency_ms"] = max(stats["max_latency_ms"], latency_ms)
+        
+        stats["successes"] += 1
+        breaker.record_success()
+        return self._parse_zoning_api_response(data)
+    
+    def get_endpoint_stats(self) -> Dict[str, Any]:
+        report = {}
+        for city, stats in self.endpoint_stats.items():
+            report[city] = {
+                **stats,
+                "avg_latency_ms": round(stats["total_latency_ms"] / stats["requests"], 2) if stats["requests"] else 0.0,
+                "circuit": self.breakers[city].snapshot()
+            }
+        return report
+    
     async def _lookup_zoning_by_parcel(self, parcel_id: str) -> Optional[Dict[str, Any]]:
-        return None
+        parcel = self.parcel_index.lookup(parcel_id)
+        if not parcel:
+            return None
+        
+        zoning_data = self._build_zoning_info(parcel["district"], "parcel_index")
+        zoning_data["parcel_id"] = normalize_parcel_id(parcel_id)
+        zoning_data["lot_area"] = parcel["lot_area"]
+        zoning_data["centroid"] = parcel["centroid"]
+        return zoning_data
     
     def _parse_zoning_api_response(self, api_data: Dict) -> Dict[str, Any]:
         district = api_data.get("zoning_district", "R-2")
+        return self._build_zoning_info(district, "municipal_api")
+    
+    def _build_zoning_info(self, district: str, source: str) -> Dict[str, Any]:
         classification = self._classify_zoning_district(district)
         
         zoning_rules = self._get_zoning_rules(classification, district)
@@ -151,7 +309,7 @@ class ZoningService:
         return {
             "district": district,
             "classification": classification,
-            "source": "municipal_api",
+            "source": source,
             "rules": zoning_rules,
             "restrictions": self._generate_restriction_list(zoning_rules)
         }
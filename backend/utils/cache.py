@@ -0,0 +1,135 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache"))
+
+
+class TieredCache:
+    def __init__(self, path: str, max_memory_entries: int = 2048):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[Tuple[str, str], Tuple[Any, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "fresh_until REAL NOT NULL, stale_until REAL NOT NULL, "
+            "PRIMARY KEY (namespace, key))"
+        )
+
+    def _count(self, namespace: str, outcome: str):
+        counters = self.stats.setdefault(namespace, {"memory_hits": 0, "disk_hits": 0, "stale_hits": 0, "misses": 0})
+        counters[outcome] += 1
+
+    def _remember(self, cache_key: Tuple[str, str], entry: Tuple[Any, float, float]):
+        self._memory[cache_key] = entry
+        self._memory.move_to_end(cache_key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def lookup(self, namespace: str, key: str) -> Tuple[Optional[Any], bool]:
+        cache_key = (namespace, key)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(cache_key)
+            tier = "memory_hits"
+            if entry is None:
+                row = self._db.execute(
+                    "SELECT value, fresh_until, stale_until FROM cache WHERE namespace = ? AND key = ?",
+                    cache_key
+                ).fetchone()
+                if row:
+                    entry = (json.loads(row[0]), row[1], row[2])
+                    tier = "disk_hits"
+
+            if entry is None or entry[2] < now:
+                if entry is not None:
+                    self._memory.pop(cache_key, None)
+                    self._db.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", cache_key)
+                self._count(namespace, "misses")
+                return None, False
+
+            self._remember(cache_key, entry)
+            is_stale = entry[1] < now
+            self._count(namespace, "stale_hits" if is_stale else tier)
+            return entry[0], is_stale
+
+    def store(self, namespace: str, key: str, value: Any, ttl: float, stale_ttl: float = 0):
+        now = time.time()
+        entry = (value, now + ttl, now + ttl + stale_ttl)
+        with self._lock:
+            self._remember((namespace, key), entry)
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, fresh_until, stale_until) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), entry[1], entry[2])
+            )
+
+    async def get_or_fetch(
+        self,
+        namespace: str,
+        key: str,
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: Callable[[Any], float],
+        stale_ttl: float = 0
+    ) -> Any:
+        value, is_stale = self.lookup(namespace, key)
+        if value is not None:
+            if is_stale:
+                self._schedule_refresh(namespace, key, fetch, ttl, stale_ttl)
+            return value
+
+        value = await fetch()
+        self._store_fetched(namespace, key, value, ttl, stale_ttl)
+        return value
+
+    def _store_fetched(self, namespace: str, key: str, value: Any, ttl: Callable[[Any], float], stale_ttl: float):
+        if value is None:
+            return
+        seconds = ttl(value)
+        if seconds > 0:
+            self.store(namespace, key, value, seconds, stale_ttl)
+
+    def _schedule_refresh(self, namespace, key, fetch, ttl, stale_ttl):
+        cache_key = (namespace, key)
+        if cache_key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                self._store_fetched(namespace, key, await fetch(), ttl, stale_ttl)
+            except Exception as e:
+                logger.warning("Cache refresh failed for %s:%s: %s", namespace, key, e)
+            finally:
+                self._refreshing.pop(cache_key, None)
+
+        self._refreshing[cache_key] = asyncio.create_task(refresh())
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        for namespace, counters in self.stats.items():
+            hits = counters["memory_hits"] + counters["disk_hits"] + counters["stale_hits"]
+            total = hits + counters["misses"]
+            report[namespace] = {**counters, "hit_rate": round(hits / total, 3) if total else 0.0}
+        return report
+
+    def close(self):
+        for task in self._refreshing.values():
+            task.cancel()
+        self._db.close()
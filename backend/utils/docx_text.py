@@ -0,0 +1,100 @@
+import re
+import zipfile
+from typing import IO, Iterator, List, Set
+
+from lxml import etree
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+TAGS = tuple(W + tag for tag in ("p", "t", "tab", "br", "cr", "tc", "tr"))
+CELL_SEPARATOR = " | "
+HEADER_PART = re.compile(r"word/header(\d*)\.xml$")
+FOOTER_PART = re.compile(r"word/footer(\d*)\.xml$")
+
+
+def _numbered_parts(names: List[str], pattern: re.Pattern) -> List[str]:
+    return sorted((name for name in names if pattern.match(name)), key=lambda name: int(pattern.match(name).group(1) or 0))
+
+
+# Walks one WordprocessingML part with iterparse, yielding each body paragraph and
+# each table row (cells joined with CELL_SEPARATOR) in document order. Finished
+# elements are cleared as we go, so memory does not grow with the document.
+def iter_part_blocks(source: IO[bytes]) -> Iterator[str]:
+    paragraphs: List[List[str]] = []
+    cells: List[List[str]] = []
+    rows: List[List[str]] = []
+
+    for event, element in etree.iterparse(source, events=("start", "end"), tag=TAGS, huge_tree=True):
+        tag = element.tag
+        if event == "start":
+            if tag == W + "p":
+                paragraphs.append([])
+            elif tag == W + "tc":
+                cells.append([])
+            elif tag == W + "tr":
+                rows.append([])
+            continue
+
+        if tag == W + "t":
+            if paragraphs:
+                paragraphs[-1].append(element.text or "")
+            continue
+        if tag == W + "tab":
+            if paragraphs:
+                paragraphs[-1].append("\t")
+            continue
+        if tag in (W + "br", W + "cr"):
+            if paragraphs:
+                paragraphs[-1].append("\n")
+            continue
+
+        if tag == W + "p":
+            text = "".join(paragraphs.pop()).strip()
+            if paragraphs:
+                # A text box paragraph nested inside another paragraph.
+                paragraphs[-1].append(" " + text if text else "")
+            elif cells:
+                if text:
+                    cells[-1].append(text)
+            elif text:
+                yield text
+        elif tag == W + "tc":
+            cell = " ".join(cells.pop())
+            if rows:
+                rows[-1].append(cell)
+        elif tag == W + "tr":
+            row_cells = rows.pop()
+            row = CELL_SEPARATOR.join(row_cells) if any(row_cells) else ""
+            if cells:
+                # A row of a table nested inside a cell.
+                if row:
+                    cells[-1].append(row)
+            elif row:
+                yield row
+
+        element.clear(keep_tail=True)
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+
+# Sections usually repeat the same header and footer; each distinct one is included once.
+def _distinct_part_blocks(archive: zipfile.ZipFile, name: str, seen: Set[str]) -> List[str]:
+    with archive.open(name) as source:
+        blocks = list(iter_part_blocks(source))
+    key = "\n".join(blocks)
+    if not key or key in seen:
+        return []
+    seen.add(key)
+    return blocks
+
+
+def iter_docx_blocks(file_path: str) -> Iterator[str]:
+    with zipfile.ZipFile(file_path) as archive:
+        names = archive.namelist()
+        seen: Set[str] = set()
+
+        for name in _numbered_parts(names, HEADER_PART):
+            yield from _distinct_part_blocks(archive, name, seen)
+        with archive.open("word/document.xml") as source:
+            yield from iter_part_blocks(source)
+        for name in _numbered_parts(names, FOOTER_PART):
+            yield from _distinct_part_blocks(archive, name, seen)
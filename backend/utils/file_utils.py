@@ -1,37 +1,88 @@
 import os
+import hashlib
 import tempfile
 import shutil
-from fastapi import UploadFile
-from typing import List
+import zipfile
+from fastapi import UploadFile, HTTPException
+from typing import List, Optional
 
-ALLOWED_EXTENSIONS = {'.pdf', '.docx', '.doc', '.jpg', '.jpeg', '.png'}
-MAX_FILE_SIZE = 10 * 1024 * 1024
+MAX_FILE_SIZE = int(os.getenv("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+HEADER_BYTES = 1024
+
+MAGIC_SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'PK\x03\x04', '.docx'),
+]
+
+class SavedUpload:
+    def __init__(self, path: str, size: int, sha256: str, extension: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.extension = extension
 
 def validate_file(file: UploadFile) -> bool:
-    if not file.filename:
-        return False
-    
-    file_extension = os.path.splitext(file.filename)[1].lower()
-    if file_extension not in ALLOWED_EXTENSIONS:
-        return False
+    # Type and size are verified from the bytes themselves while the upload is saved.
+    return bool(file.filename)
+
+def detect_file_type(header: bytes, file_path: str) -> Optional[str]:
+    # PDF readers accept the header anywhere in the first kilobyte.
+    if b'%PDF-' in header[:HEADER_BYTES]:
+        return '.pdf'
     
-    if file.size and file.size > MAX_FILE_SIZE:
-        return False
+    for signature, extension in MAGIC_SIGNATURES:
+        if header.startswith(signature):
+            if extension == '.docx':
+                try:
+                    with zipfile.ZipFile(file_path) as archive:
+                        if 'word/document.xml' not in archive.namelist():
+                            return None
+                except zipfile.BadZipFile:
+                    return None
+            return extension
     
-    return True
+    return None
 
-async def save_uploaded_file(file: UploadFile) -> str:
-    file_extension = os.path.splitext(file.filename)[1].lower()
-    temp_file = tempfile.NamedTemporaryFile(suffix=file_extension, delete=False)
+async def save_uploaded_file(file: UploadFile, max_bytes: int = MAX_FILE_SIZE) -> SavedUpload:
+    temp_file = tempfile.NamedTemporaryFile(delete=False)
+    digest = hashlib.sha256()
+    header = b''
+    size = 0
     
     try:
-        contents = await file.read()
-        temp_file.write(contents)
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail=f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit")
+            
+            if len(header) < HEADER_BYTES:
+                header += chunk[:HEADER_BYTES - len(header)]
+            digest.update(chunk)
+            temp_file.write(chunk)
+        
         temp_file.close()
-        return temp_file.name
+        
+        extension = detect_file_type(header, temp_file.name)
+        if extension is None:
+            raise HTTPException(status_code=415, detail="Unsupported file type; upload a PDF, DOCX, JPG or PNG")
+        
+        path = temp_file.name + extension
+        os.replace(temp_file.name, path)
+        return SavedUpload(path, size, digest.hexdigest(), extension)
+    
+    except HTTPException:
+        temp_file.close()
+        cleanup_temp_file(temp_file.name)
+        raise
     except Exception as e:
-        if os.path.exists(temp_file.name):
-            os.unlink(temp_file.name)
+        temp_file.close()
+        cleanup_temp_file(temp_file.name)
         raise Exception(f"Failed to save uploaded file: {str(e)}")
 
 def cleanup_temp_file(file_path: str):
@@ -0,0 +1,76 @@
+import asyncio
+import os
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.0"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "8.0"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "5.0"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30.0"))
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "10"))
+
+
+class HTTPClient:
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None, max_per_host: int = HTTP_MAX_PER_HOST):
+        self.timeout = httpx.Timeout(
+            connect=HTTP_CONNECT_TIMEOUT,
+            read=HTTP_READ_TIMEOUT,
+            write=HTTP_READ_TIMEOUT,
+            pool=HTTP_POOL_TIMEOUT
+        )
+        self.limits = httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        )
+        self.max_per_host = max_per_host
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                transport=self._transport,
+                follow_redirects=True
+            )
+        return self._client
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_per_host)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def get(self, url: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> httpx.Response:
+        async with self._host_semaphore(url):
+            return await self.client.get(url, params=params, **kwargs)
+
+    async def close(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+
+_shared_client: Optional[HTTPClient] = None
+
+
+def get_http_client() -> HTTPClient:
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = HTTPClient()
+    return _shared_client
+
+
+async def close_http_client():
+    if _shared_client is not None:
+        await _shared_client.close()
@@ -0,0 +1,118 @@
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+DESKEW_MAX_ANGLE = 5.0
+DESKEW_STEP = 0.25
+# Skew is estimated on a subsample of ink pixels; the angle is stable well below this.
+DESKEW_SAMPLE_PIXELS = 60000
+# An uploaded photo or scan is treated as one letter-size page when normalizing DPI.
+PAGE_LONG_EDGE_INCHES = 11.0
+# Photos are only cropped and downscaled when their long edge is at least this many
+# times the target; below that JPEG draft decoding cannot skip any pixels and the
+# resize costs more than it saves.
+PAGE_DOWNSCALE_RATIO = 2.0
+EXIF_ORIENTATION = 0x0112
+# Rows and columns at least this bright, relative to the brightest, belong to the sheet
+# rather than the desk around it.
+PAGE_BRIGHT_FRACTION = 0.5
+PAGE_CROP_STEP = 4
+
+
+def to_grayscale(image: Image.Image) -> np.ndarray:
+    if image.mode == "L":
+        return np.asarray(image, dtype=np.uint8)
+    rgb = np.asarray(image.convert("RGB"), dtype=np.float32)
+    return (rgb @ LUMA_WEIGHTS).clip(0, 255).astype(np.uint8)
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+    background = np.cumsum(histogram)
+    foreground = background[-1] - background
+    cumulative_mean = np.cumsum(histogram * levels)
+
+    # Between-class variance for every threshold at once.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = (cumulative_mean[-1] * background - cumulative_mean * background[-1]) ** 2 / (background * foreground)
+    return int(np.argmax(np.nan_to_num(variance)))
+
+
+def estimate_skew(ink: np.ndarray, max_angle: float = DESKEW_MAX_ANGLE, step: float = DESKEW_STEP) -> float:
+    ys, xs = np.nonzero(ink)
+    if len(ys) < 100:
+        return 0.0
+    if len(ys) > DESKEW_SAMPLE_PIXELS:
+        stride = len(ys) // DESKEW_SAMPLE_PIXELS + 1
+        ys, xs = ys[::stride], xs[::stride]
+
+    # Shear the ink coordinates by every candidate angle at once; text lines are
+    # level where the row histogram is sharpest (highest sum of squares).
+    angles = np.arange(-max_angle, max_angle + step / 2, step)
+    rows = np.rint(ys[None, :] + xs[None, :] * np.tan(np.radians(angles))[:, None]).astype(np.int64)
+    rows -= rows.min(axis=1, keepdims=True)
+    height = int(rows.max()) + 1
+    profiles = np.bincount((rows + np.arange(len(angles))[:, None] * height).ravel(), minlength=len(angles) * height)
+    scores = np.square(profiles.reshape(len(angles), height).astype(np.float64)).sum(axis=1)
+    return float(angles[np.argmax(scores)])
+
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    return gray <= otsu_threshold(gray)
+
+
+def preprocess_scan(image: Image.Image) -> Tuple[Image.Image, float]:
+    gray = to_grayscale(image)
+    ink = binarize(gray)
+
+    angle = estimate_skew(ink[::2, ::2])
+    if abs(angle) >= DESKEW_STEP:
+        rotated = Image.fromarray(gray).rotate(-angle, resample=Image.BILINEAR, expand=True, fillcolor=255)
+        ink = binarize(np.asarray(rotated, dtype=np.uint8))
+
+    return Image.fromarray(np.where(ink, 0, 255).astype(np.uint8)), angle
+
+
+def crop_to_page(gray: np.ndarray) -> np.ndarray:
+    # The page edges are found on a subsample; a few pixels of margin do not matter to OCR.
+    step = PAGE_CROP_STEP
+    sample = gray[::step, ::step]
+    bright = sample > otsu_threshold(sample)
+    row_share, column_share = bright.mean(axis=1), bright.mean(axis=0)
+    rows = np.flatnonzero(row_share > row_share.max() * PAGE_BRIGHT_FRACTION)
+    columns = np.flatnonzero(column_share > column_share.max() * PAGE_BRIGHT_FRACTION)
+    if len(rows) < sample.shape[0] // 4 or len(columns) < sample.shape[1] // 4:
+        return gray
+    return gray[rows[0] * step:(rows[-1] + 1) * step, columns[0] * step:(columns[-1] + 1) * step]
+
+
+# Loads a photographed or scanned page for OCR without ever holding the full-size
+# RGB image: JPEGs are decoded straight to grayscale at the smallest DCT scale that
+# still covers the target resolution. Returns None when the upload can go to
+# tesseract as is; pages stored sideways are only turned upright.
+def load_page_image(file_path: str, dpi: int, binarize_page: bool = False) -> Optional[Image.Image]:
+    target = int(PAGE_LONG_EDGE_INCHES * dpi)
+    with Image.open(file_path) as image:
+        scale = target / max(image.size)
+        normalize = binarize_page or scale * PAGE_DOWNSCALE_RATIO <= 1
+        if not normalize and image.getexif().get(EXIF_ORIENTATION, 1) == 1:
+            return None
+        if image.format == "JPEG":
+            image.draft("L", (int(image.width * min(scale, 1)), int(image.height * min(scale, 1))))
+        ImageOps.exif_transpose(image, in_place=True)
+        # Pillow's own 8-bit conversion keeps peak memory at one byte per pixel for PNGs.
+        if not normalize:
+            return image.convert("L")
+        gray = np.asarray(image if image.mode == "L" else image.convert("L"), dtype=np.uint8)
+
+    page = Image.fromarray(crop_to_page(gray))
+    scale = target / max(page.size)
+    if scale < 1:
+        page = page.resize((max(1, round(page.width * scale)), max(1, round(page.height * scale))), Image.LANCZOS, reducing_gap=2.0)
+
+    if binarize_page:
+        page, _ = preprocess_scan(page)
+    return page
@@ -0,0 +1,138 @@
+import io
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image
+
+from utils.cache import CACHE_DIR
+
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", os.path.join(CACHE_DIR, "images"))
+IMAGE_STORE_MAX_BYTES = int(os.getenv("IMAGE_STORE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# Variant name -> (file name, media type, longest edge or None for full size, encoder options)
+VARIANTS = {
+    "original": ("original.png", "image/png", None, {"format": "PNG", "optimize": True}),
+    "web": ("web.jpg", "image/jpeg", 1024, {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True}),
+    "thumbnail": ("thumbnail.jpg", "image/jpeg", 256, {"format": "JPEG", "quality": 75, "optimize": True}),
+}
+
+
+def render_variants(image_bytes: bytes) -> Dict[str, bytes]:
+    with Image.open(io.BytesIO(image_bytes)) as source:
+        source.load()
+        rgb = source.convert("RGB")
+
+    rendered = {}
+    for variant, (_, _, max_edge, options) in VARIANTS.items():
+        if variant == "original" and source.format == "PNG":
+            rendered[variant] = image_bytes
+            continue
+
+        image = rgb.copy()
+        if max_edge:
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, **options)
+        rendered[variant] = buffer.getvalue()
+    return rendered
+
+
+class ImageStore:
+    def __init__(self, root: str = IMAGE_STORE_DIR, max_bytes: int = IMAGE_STORE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+        os.makedirs(root, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "index.sqlite3"), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS images ("
+            "key TEXT PRIMARY KEY, prompt TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS images_last_access ON images (last_access)")
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM images").fetchone()[0]
+
+    def _directory(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM images WHERE key = ?", (key,)).fetchone()
+            if row is None or not os.path.isdir(self._directory(key)):
+                self.stats["misses"] += 1
+                return False
+
+            self._db.execute("UPDATE images SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.stats["hits"] += 1
+            return True
+
+    def path(self, key: str, variant: str) -> Optional[Tuple[str, str]]:
+        if variant not in VARIANTS or not key.isalnum():
+            return None
+
+        file_name, media_type, _, _ = VARIANTS[variant]
+        file_path = os.path.join(self._directory(key), file_name)
+        if not os.path.exists(file_path):
+            return None
+
+        with self._lock:
+            self._db.execute("UPDATE images SET last_access = ? WHERE key = ?", (time.time(), key))
+        return file_path, media_type
+
+    def put(self, key: str, image_bytes: bytes, prompt: str):
+        rendered = render_variants(image_bytes)
+        directory = self._directory(key)
+        staging = f"{directory}.tmp-{threading.get_ident()}"
+        os.makedirs(staging, exist_ok=True)
+        for variant, content in rendered.items():
+            with open(os.path.join(staging, VARIANTS[variant][0]), "wb") as handle:
+                handle.write(content)
+
+        size = sum(len(content) for content in rendered.values())
+        now = time.time()
+        with self._lock:
+            previous = self._db.execute("SELECT size FROM images WHERE key = ?", (key,)).fetchone()
+            if previous and os.path.isdir(directory):
+                shutil.rmtree(staging, ignore_errors=True)
+                return
+            shutil.rmtree(directory, ignore_errors=True)
+            os.replace(staging, directory)
+
+            if previous:
+                self._total_bytes -= previous[0]
+            self._db.execute("INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?)", (key, prompt, size, now, now))
+            self._total_bytes += size
+            self.stats["stored"] += 1
+            self._evict()
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        evicted = []
+        for key, size in self._db.execute("SELECT key, size FROM images ORDER BY last_access").fetchall():
+            if self._total_bytes <= self.max_bytes:
+                break
+            shutil.rmtree(self._directory(key), ignore_errors=True)
+            self._total_bytes -= size
+            evicted.append((key,))
+        self._db.executemany("DELETE FROM images WHERE key = ?", evicted)
+        self.stats["evicted"] += len(evicted)
+
+    def urls(self, key: str) -> Dict[str, str]:
+        return {variant: f"/api/visuals/{key}/{variant}" for variant in VARIANTS}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+        return {"images": count, "total_bytes": self._total_bytes, "max_bytes": self.max_bytes, **self.stats}
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from utils.cache import CACHE_DIR
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm.sqlite3"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def content_key(**parts: Any) -> str:
+    canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(self, path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_MAX_BYTES, default_ttl: int = LLM_CACHE_TTL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, endpoint TEXT NOT NULL, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL NOT NULL, last_access REAL NOT NULL, latency_ms REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _counters(self, endpoint: str) -> Dict[str, float]:
+        return self.stats.setdefault(endpoint, {"hits": 0, "misses": 0, "bypassed": 0, "latency_saved_ms": 0.0})
+
+    def get(self, endpoint: str, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, size, expires_at, latency_ms FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+
+            value, size, expires_at, latency_ms = row
+            if expires_at < now:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                return None
+
+            self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._counters(endpoint)["latency_saved_ms"] += latency_ms
+            return value
+
+    def put(self, endpoint: str, key: str, value: str, latency_ms: float, ttl: Optional[int] = None):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._lock:
+            previous = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if previous:
+                self._total_bytes -= previous[0]
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, value, size, now + (ttl or self.default_ttl), now, latency_ms)
+            )
+            self._total_bytes += size
+            self._evict()
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+
+        self._db.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+        while self._total_bytes > self.max_bytes:
+            victims = self._db.execute("SELECT key, size FROM responses ORDER BY last_access LIMIT 64").fetchall()
+            if not victims:
+                break
+            self._db.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key, _ in victims])
+            self._total_bytes -= sum(size for _, size in victims)
+
+    def record(self, endpoint: str, outcome: str):
+        self._counters(endpoint)[outcome] += 1
+
+    async def get_or_call(
+        self,
+        endpoint: str,
+        key: str,
+        call: Callable[[], Awaitable[str]],
+        bypass: bool = False,
+        validate: Optional[Callable[[str], bool]] = None,
+        ttl: Optional[int] = None
+    ) -> str:
+        if bypass:
+            self.record(endpoint, "bypassed")
+        else:
+            cached = self.get(endpoint, key)
+            self.record(endpoint, "misses" if cached is None else "hits")
+            if cached is not None:
+                return cached
+
+        start = time.perf_counter()
+        value = await call()
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        if value and (validate is None or validate(value)):
+            self.put(endpoint, key, value, latency_ms, ttl)
+        return value
+
+    def get_stats(self) -> Dict[str, Any]:
+        report = {"total_bytes": self._total_bytes, "max_bytes": self.max_bytes, "endpoints": {}}
+        for endpoint, counters in self.stats.items():
+            lookups = counters["hits"] + counters["misses"]
+            report["endpoints"][endpoint] = {
+                **counters,
+                "latency_saved_ms": round(counters["latency_saved_ms"], 1),
+                "hit_rate": round(counters["hits"] / lookups, 3) if lookups else 0.0
+            }
+        return report
+
+    def close(self):
+        self._db.close()
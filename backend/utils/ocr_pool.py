@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pdfplumber
+import pytesseract
+
+from utils.image_preprocess import PAGE_LONG_EDGE_INCHES, load_page_image, preprocess_scan
+
+logger = logging.getLogger(__name__)
+
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+OCR_PAGE_BUDGET = int(os.getenv("OCR_PAGE_BUDGET", "40"))
+OCR_DOCUMENT_TIMEOUT = float(os.getenv("OCR_DOCUMENT_TIMEOUT", "180"))
+OCR_PAGE_TIMEOUT = float(os.getenv("OCR_PAGE_TIMEOUT", "60"))
+# "page" rasterizes a textless page once and OCRs it in one pass; "images" OCRs
+# each embedded image crop separately.
+OCR_MODE = os.getenv("OCR_MODE", "page")
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_MODES = ("page", "images")
+# Photos of forms at twice this resolution or more are normalized to it before OCR; "gray" leaves
+# thresholding to tesseract, "binary" also binarizes and deskews.
+OCR_IMAGE_DPI = int(os.getenv("OCR_IMAGE_DPI", "200"))
+OCR_IMAGE_MODE = os.getenv("OCR_IMAGE_MODE", "gray")
+OCR_IMAGE_MODES = ("gray", "binary")
+
+
+# pytesseract hands images to tesseract as PNG, and compressing a page-sized scan
+# costs about as much as preparing it; an uncompressed PGM is written in milliseconds.
+def tesseract_page(page: Any, config: str, page_timeout: float) -> str:
+    with tempfile.NamedTemporaryFile(suffix=".pgm") as handle:
+        page.save(handle, format="PPM")
+        handle.flush()
+        return pytesseract.image_to_string(handle.name, config=config, timeout=page_timeout)
+
+
+def ocr_page_images(page: Any, page_timeout: float) -> str:
+    texts = []
+    for image in page.images:
+        try:
+            bbox = (image['x0'], image['top'], image['x1'], image['bottom'])
+            pil_image = page.crop(bbox).to_image().original
+            texts.append(pytesseract.image_to_string(pil_image, timeout=page_timeout))
+        except Exception:
+            continue
+    return "\n".join(text for text in texts if text.strip())
+
+
+def ocr_rasterized_page(page: Any, dpi: int, page_timeout: float) -> str:
+    scan, _ = preprocess_scan(page.to_image(resolution=dpi).original)
+    return tesseract_page(scan, f'--psm 3 --dpi {dpi}', page_timeout)
+
+
+def ocr_pdf_page(file_path: str, page_index: int, mode: str, dpi: int, page_timeout: float) -> str:
+    with pdfplumber.open(file_path) as pdf:
+        page = pdf.pages[page_index]
+        if mode == "images":
+            return ocr_page_images(page, page_timeout)
+        return ocr_rasterized_page(page, dpi, page_timeout)
+
+
+# Uploads that need no normalizing are read by tesseract straight from the file,
+# which also keeps their own resolution metadata.
+def ocr_image_file(file_path: str, dpi: int, mode: str, page_timeout: float) -> str:
+    page = load_page_image(file_path, dpi, binarize_page=mode == "binary")
+    if page is None:
+        return pytesseract.image_to_string(file_path, config='--psm 6', timeout=page_timeout)
+    page_dpi = round(max(page.size) / PAGE_LONG_EDGE_INCHES)
+    return tesseract_page(page, f'--psm 6 --dpi {page_dpi}', page_timeout)
+
+
+class OCRPool:
+    def __init__(
+        self,
+        max_workers: int = OCR_WORKERS,
+        page_budget: int = OCR_PAGE_BUDGET,
+        document_timeout: float = OCR_DOCUMENT_TIMEOUT,
+        page_timeout: float = OCR_PAGE_TIMEOUT,
+        mode: str = OCR_MODE,
+        dpi: int = OCR_DPI,
+        image_dpi: int = OCR_IMAGE_DPI,
+        image_mode: str = OCR_IMAGE_MODE
+    ):
+        if mode not in OCR_MODES:
+            raise ValueError(f"Unknown OCR mode: {mode}")
+        if image_mode not in OCR_IMAGE_MODES:
+            raise ValueError(f"Unknown OCR image mode: {image_mode}")
+        self.max_workers = max_workers
+        self.page_budget = page_budget
+        self.document_timeout = document_timeout
+        self.page_timeout = page_timeout
+        self.mode = mode
+        self.dpi = dpi
+        self.image_dpi = image_dpi
+        self.image_mode = image_mode
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.stats = {"documents": 0, "pages": 0, "failed_pages": 0, "timed_out_pages": 0, "skipped_pages": 0}
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Tesseract is already a subprocess per call; spawn keeps the workers free of
+            # the parent's event loop, sqlite handles and thread locks.
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def batch(self) -> "OCRBatch":
+        return OCRBatch(self)
+
+    async def run_pages(self, jobs: List[Tuple[Callable[..., str], Tuple[Any, ...]]]) -> List[Optional[str]]:
+        batch = self.batch()
+        futures = [batch.submit(fn, *args) for fn, args in jobs]
+        return [await batch.result(future) for future in futures]
+
+    async def ocr_image(self, file_path: str) -> Optional[str]:
+        return (await self.run_pages([(ocr_image_file, (file_path, self.image_dpi, self.image_mode))]))[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"workers": self.max_workers, "mode": self.mode, "dpi": self.dpi, "image_mode": self.image_mode, "image_dpi": self.image_dpi, "page_budget": self.page_budget, **self.stats}
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# One document's share of the pool: pages are submitted as they are discovered,
+# capped by the page budget and bounded by a deadline that starts with the first page.
+class OCRBatch:
+    def __init__(self, pool: OCRPool):
+        self.pool = pool
+        self.submitted = 0
+        self.deadline: Optional[float] = None
+
+    def submit(self, fn: Callable[..., str], *args: Any) -> Optional[asyncio.Future]:
+        if self.submitted >= self.pool.page_budget:
+            self.pool.stats["skipped_pages"] += 1
+            return None
+
+        loop = asyncio.get_running_loop()
+        if self.deadline is None:
+            self.deadline = loop.time() + self.pool.document_timeout
+            self.pool.stats["documents"] += 1
+        self.submitted += 1
+        return loop.run_in_executor(self.pool.executor, fn, *args, self.pool.page_timeout)
+
+    def submit_pdf_page(self, file_path: str, page_index: int) -> Optional[asyncio.Future]:
+        return self.submit(ocr_pdf_page, file_path, page_index, self.pool.mode, self.pool.dpi)
+
+    async def result(self, future: Optional[asyncio.Future]) -> Optional[str]:
+        if future is None:
+            return None
+
+        try:
+            text = await asyncio.wait_for(future, timeout=max(0.0, self.deadline - asyncio.get_running_loop().time()))
+        except asyncio.TimeoutError:
+            self.pool.stats["timed_out_pages"] += 1
+            return None
+        except Exception as e:
+            logger.warning("OCR error: %s", e)
+            self.pool.stats["failed_pages"] += 1
+            return None
+
+        self.pool.stats["pages"] += 1
+        return text
+
+    def cancel(self, futures: List[Optional[asyncio.Future]]):
+        for future in futures:
+            if future is not None:
+                future.cancel()
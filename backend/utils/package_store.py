@@ -0,0 +1,57 @@
+import glob
+import os
+import shutil
+import time
+import uuid
+from typing import Optional, Tuple
+
+from utils.cache import CACHE_DIR
+
+PACKAGE_STORE_DIR = os.getenv("PACKAGE_STORE_DIR", os.path.join(CACHE_DIR, "packages"))
+PACKAGE_TTL = int(os.getenv("PACKAGE_TTL", "900"))
+
+
+# Finished permit packages are kept on disk under the cache directory rather than in
+# process memory, so any worker can serve the download and packages survive a restart
+# until they expire. The file name carries the export type. A download claims the
+# package by renaming it out of the store, so exactly one request gets it.
+class PackageStore:
+    def __init__(self, root: str = PACKAGE_STORE_DIR, ttl: int = PACKAGE_TTL):
+        self.root = root
+        self.ttl = ttl
+        os.makedirs(root, exist_ok=True)
+
+    def put(self, file_path: str, export_type: str) -> str:
+        self.prune()
+        package_id = uuid.uuid4().hex
+        stored = os.path.join(self.root, f"{package_id}.{export_type}")
+        shutil.move(file_path, stored)
+        os.utime(stored)
+        return package_id
+
+    def claim(self, package_id: str) -> Optional[Tuple[str, str]]:
+        if not package_id.isalnum():
+            return None
+
+        for stored in glob.glob(os.path.join(self.root, f"{package_id}.*")):
+            export_type = stored.rsplit(".", 1)[1]
+            claimed = os.path.join(self.root, f".claimed-{uuid.uuid4().hex}.{export_type}")
+            try:
+                os.replace(stored, claimed)
+            except FileNotFoundError:
+                return None
+            if os.path.getmtime(claimed) + self.ttl < time.time():
+                os.unlink(claimed)
+                return None
+            return claimed, export_type
+        return None
+
+    # Also removes claimed files a crashed download never cleaned up.
+    def prune(self):
+        cutoff = time.time() - self.ttl
+        for entry in os.scandir(self.root):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.unlink(entry.path)
+            except FileNotFoundError:
+                continue
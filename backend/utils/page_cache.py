@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdftypes import PDFStream, resolve1
+
+from utils.cache import CACHE_DIR
+
+PAGE_CACHE_PATH = os.getenv("PAGE_CACHE_PATH", os.path.join(CACHE_DIR, "pages.sqlite3"))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+# Bump when extraction output changes so stale page text is not reused.
+EXTRACTION_VERSION = "7"
+
+
+def _hash_resources(digest, resources: Any, depth: int = 0):
+    resources = resolve1(resources) or {}
+    if not isinstance(resources, dict) or depth > 4:
+        return
+
+    fonts = resolve1(resources.get("Font")) or {}
+    for name in sorted(fonts):
+        font = resolve1(fonts[name])
+        digest.update(f"font:{name}:{font.get('BaseFont') if isinstance(font, dict) else ''}".encode())
+
+    xobjects = resolve1(resources.get("XObject")) or {}
+    for name in sorted(xobjects):
+        xobject = resolve1(xobjects[name])
+        if isinstance(xobject, PDFStream):
+            digest.update(f"xobject:{name}".encode())
+            digest.update(xobject.get_rawdata() or b"")
+            _hash_resources(digest, xobject.attrs.get("Resources"), depth + 1)
+
+
+# Hashes what is drawn on a page straight from the raw PDF streams, so unchanged
+# pages can be recognised without extracting or OCR-ing them.
+def pdf_page_fingerprint(page: PDFPage) -> str:
+    digest = hashlib.sha256(f"v{EXTRACTION_VERSION}:{page.mediabox}:{page.rotate}".encode())
+    for stream in page.contents or []:
+        stream = resolve1(stream)
+        if isinstance(stream, PDFStream):
+            digest.update(stream.get_rawdata() or b"")
+    _hash_resources(digest, page.resources)
+    return digest.hexdigest()
+
+
+class PageTextCache:
+    def __init__(self, path: str = PAGE_CACHE_PATH, max_bytes: int = PAGE_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "page_hash TEXT PRIMARY KEY, text TEXT NOT NULL, method TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS versions ("
+            "document_key TEXT NOT NULL, sha256 TEXT NOT NULL, page_hashes TEXT NOT NULL, created_at REAL NOT NULL, "
+            "PRIMARY KEY (document_key, sha256))"
+        )
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def get_many(self, page_hashes: List[str]) -> Dict[str, Tuple[str, str]]:
+        if not page_hashes:
+            return {}
+
+        unique = list(dict.fromkeys(page_hashes))
+        with self._lock:
+            found: Dict[str, Tuple[str, str]] = {}
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                found.update(
+                    (page_hash, (text, method)) for page_hash, text, method in self._db.execute(
+                        f"SELECT page_hash, text, method FROM pages WHERE page_hash IN ({placeholders})", batch
+                    )
+                )
+            if found:
+                self._db.executemany("UPDATE pages SET last_access = ? WHERE page_hash = ?", [(time.time(), key) for key in found])
+
+        self.stats["hits"] += sum(1 for page_hash in page_hashes if page_hash in found)
+        self.stats["misses"] += sum(1 for page_hash in page_hashes if page_hash not in found)
+        return found
+
+    def put_many(self, pages: Dict[str, str], method: str):
+        if not pages:
+            return
+
+        now = time.time()
+        with self._lock:
+            for page_hash, text in pages.items():
+                size = len(text.encode("utf-8"))
+                previous = self._db.execute("SELECT size FROM pages WHERE page_hash = ?", (page_hash,)).fetchone()
+                if previous:
+                    self._total_bytes -= previous[0]
+                self._db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)", (page_hash, text, method, size, now))
+                self._total_bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes:
+            victims = self._db.execute("SELECT page_hash, size FROM pages ORDER BY last_access LIMIT 256").fetchall()
+            if not victims:
+                break
+            self._db.executemany("DELETE FROM pages WHERE page_hash = ?", [(key,) for key, _ in victims])
+            self._total_bytes -= sum(size for _, size in victims)
+
+    def record_version(self, document_key: str, sha256: str, page_hashes: List[str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            previous = self._db.execute(
+                "SELECT sha256, page_hashes FROM versions WHERE document_key = ? AND sha256 != ? ORDER BY created_at DESC LIMIT 1",
+                (document_key, sha256)
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO versions VALUES (?, ?, ?, ?)",
+                (document_key, sha256, json.dumps(page_hashes), time.time())
+            )
+
+        if previous is None:
+            return None
+
+        previous_sha256, previous_hashes = previous[0], json.loads(previous[1])
+        previous_set, current_set = set(previous_hashes), set(page_hashes)
+        changed = [number for number, page_hash in enumerate(page_hashes, start=1) if page_hash not in previous_set]
+        # A page replaced in place is reported as changed, not also as removed.
+        replaced = set(changed)
+        return {
+            "previous_sha256": previous_sha256,
+            "previous_page_count": len(previous_hashes),
+            "page_count": len(page_hashes),
+            "changed_pages": changed,
+            "removed_pages": [
+                number for number, page_hash in enumerate(previous_hashes, start=1)
+                if page_hash not in current_set and number not in replaced
+            ],
+            "unchanged_pages": sum(1 for page_hash in page_hashes if page_hash in previous_set)
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "total_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0
+        }
+
+    def close(self):
+        self._db.close()
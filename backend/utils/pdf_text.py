@@ -0,0 +1,137 @@
+import math
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+from pdfminer.pdfdevice import PDFTextDevice
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdffont import PDFUnicodeNotDefined
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+
+# "fast" reads the text layer straight from pdfminer's interpreter and only falls
+# back to pdfplumber layout analysis for pages it cannot read; "layout" always
+# uses pdfplumber.
+PDF_TEXT_MODE = os.getenv("PDF_TEXT_MODE", "fast")
+PDF_TEXT_MODES = ("fast", "layout")
+# Glyphs without a unicode mapping come out as "(cid:N)" noise from any text extractor.
+MAX_UNMAPPED_RATIO = 0.3
+
+
+class PageText:
+    def __init__(self, text: str, chars: int, unmapped: int, rotated: int, images: int):
+        self.text = text
+        self.chars = chars
+        self.unmapped = unmapped
+        self.rotated = rotated
+        self.images = images
+
+    @property
+    def usable(self) -> bool:
+        return self.chars > 0 and self.unmapped / self.chars <= MAX_UNMAPPED_RATIO
+
+    @property
+    def needs_ocr(self) -> bool:
+        return not self.usable and bool(self.images or self.unmapped)
+
+
+# Collects decoded glyphs in content-stream order without building pdfminer's
+# layout objects, inserting spaces and newlines from glyph positions. Rotated
+# labels (common on CAD sheets) are followed along their own baseline and emitted
+# as one line each instead of one line per glyph.
+class TextLayerDevice(PDFTextDevice):
+    def begin_page(self, page: PDFPage, ctm: Any):
+        super().begin_page(page, ctm)
+        self.parts: List[str] = []
+        self.chars = self.unmapped = self.rotated = self.images = 0
+        self.last_y = None
+        self.last_end_x = 0.0
+        self.run: Optional[Dict[str, Any]] = None
+
+    def _close_run(self):
+        if self.run is not None:
+            self.parts.append("\n" + "".join(self.run["parts"]) + "\n")
+            self.run = None
+            self.last_y = None
+
+    def _render_rotated(self, text: str, a: float, b: float, x: float, y: float, height: float, advance: float):
+        scale = math.hypot(a, b) or 1.0
+        ux, uy = a / scale, b / scale
+        along, across = x * ux + y * uy, y * ux - x * uy
+        angle = round(math.degrees(math.atan2(uy, ux)))
+
+        run = self.run
+        if run is not None and run["angle"] == angle and abs(across - run["across"]) <= height * 0.5:
+            if along - run["end"] > height * 0.2 and not text.isspace() and not run["parts"][-1].isspace():
+                run["parts"].append(" ")
+        else:
+            self._close_run()
+            run = self.run = {"angle": angle, "across": across, "parts": []}
+        run["parts"].append(text)
+        run["end"] = along + advance * scale
+
+    def render_image(self, name: str, stream: Any):
+        self.images += 1
+
+    def render_char(self, matrix, font, fontsize, scaling, rise, cid, ncs, graphicstate) -> float:
+        advance = font.char_width(cid) * fontsize * scaling
+        try:
+            text = font.to_unichr(cid)
+        except PDFUnicodeNotDefined:
+            self.unmapped += 1
+            return advance
+
+        a, b, c, d, x, y = matrix
+        height = fontsize * math.hypot(c, d) or fontsize
+        self.chars += 1
+        if abs(b) > 0.01 * abs(a) or abs(c) > 0.01 * abs(d):
+            self.rotated += 1
+            self._render_rotated(text, a, b, x, y, height, advance)
+            return advance
+        self._close_run()
+
+        if self.last_y is not None:
+            if abs(y - self.last_y) > height * 0.5:
+                self.parts.append("\n")
+            elif x - self.last_end_x > height * 0.2 and not text.isspace() and not self.parts[-1].isspace():
+                self.parts.append(" ")
+
+        self.parts.append(text)
+        self.last_y = y
+        self.last_end_x = x + advance * math.hypot(a, b)
+        return advance
+
+    def page_text(self) -> PageText:
+        self._close_run()
+        text = "\n".join(line.strip() for line in "".join(self.parts).splitlines() if line.strip())
+        return PageText(text, self.chars, self.unmapped, self.rotated, self.images)
+
+
+class TextLayerReader:
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def __enter__(self) -> "TextLayerReader":
+        self._file = open(self.file_path, 'rb')
+        try:
+            # Without object caching, page content is released once a page is read,
+            # so memory stays flat however many sheets the set has. Fonts are still
+            # cached by the resource manager.
+            self.document = PDFDocument(PDFParser(self._file), caching=False)
+            resources = PDFResourceManager(caching=True)
+            self.device = TextLayerDevice(resources)
+            self.interpreter = PDFPageInterpreter(resources, self.device)
+        except Exception:
+            self._file.close()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+
+    def pages(self) -> Iterator[PDFPage]:
+        return PDFPage.create_pages(self.document)
+
+    def read(self, page: PDFPage) -> PageText:
+        self.interpreter.process_page(page)
+        return self.device.page_text()
@@ -0,0 +1,219 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+import openai
+
+T = TypeVar("T")
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_REVIEW = 1
+PRIORITY_IMAGE = 2
+PRIORITY_BATCH = 3
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive", PRIORITY_REVIEW: "review", PRIORITY_IMAGE: "image", PRIORITY_BATCH: "batch"
+}
+
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))
+# The default is gpt-4o's usage tier 1 limit; set it to the account's tier. Calls
+# reserve their prompt plus max_tokens and are refunded what they did not use.
+# 0 leaves tokens unmetered.
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "30000"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+OPENAI_BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "1.0"))
+OPENAI_BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "30.0"))
+
+
+# A per_minute of 0 or less makes the bucket unlimited.
+class TokenBucket:
+    def __init__(self, per_minute: int):
+        self.unlimited = per_minute <= 0
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def seconds_until(self, amount: float) -> float:
+        if self.unlimited:
+            return 0.0
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def consume(self, amount: float):
+        if not self.unlimited:
+            self.level -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        if not self.unlimited and amount > 0:
+            self.level = min(self.capacity, self.level + amount)
+
+
+def estimate_prompt_tokens(*texts: str, completion_tokens: int) -> int:
+    return sum(len(text) for text in texts) // 4 + completion_tokens
+
+
+def usage_tokens(response: Any) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for header in ("retry-after-ms", "retry-after"):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        return seconds / 1000 if header == "retry-after-ms" else seconds
+    return None
+
+
+# A 429 for an exhausted quota or billing limit will not clear by waiting.
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, openai.RateLimitError) and getattr(error, "code", None) == "insufficient_quota":
+        return False
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+class OpenAIScheduler:
+    def __init__(self, rpm: int = OPENAI_RPM, tpm: int = OPENAI_TPM, max_retries: int = OPENAI_MAX_RETRIES):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self._queue: List[List[Any]] = []
+        self._sequence = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._cooldown_until = 0.0
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self.counters = {"rate_limited": 0, "server_errors": 0, "retries": 0, "gave_up": 0}
+
+    def _priority_stats(self, priority: int) -> Dict[str, float]:
+        name = PRIORITY_NAMES.get(priority, str(priority))
+        return self.stats.setdefault(name, {"admitted": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0})
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        while True:
+            while self._queue and self._queue[0][3].done():
+                heapq.heappop(self._queue)
+
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            _, _, amount, future, enqueued_at = self._queue[0]
+            delay = max(self._cooldown_until - now, self.requests.seconds_until(1), self.tokens.seconds_until(amount))
+
+            if delay <= 0:
+                heapq.heappop(self._queue)
+                self.requests.consume(1)
+                self.tokens.consume(amount)
+                future.set_result(now - enqueued_at)
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _acquire(self, priority: int, estimated_tokens: int):
+        self._ensure_dispatcher()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, [priority, next(self._sequence), estimated_tokens, future, time.monotonic()])
+        self._wakeup.set()
+
+        waited = await future
+        stats = self._priority_stats(priority)
+        stats["admitted"] += 1
+        stats["total_wait_ms"] += waited * 1000
+        stats["max_wait_ms"] = max(stats["max_wait_ms"], waited * 1000)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return min(retry_after, OPENAI_BACKOFF_MAX) + random.uniform(0, OPENAI_BACKOFF_BASE)
+        return random.uniform(0, min(OPENAI_BACKOFF_MAX, OPENAI_BACKOFF_BASE * 2 ** attempt))
+
+    async def submit(self, priority: int, estimated_tokens: int, call: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            await self._acquire(priority, estimated_tokens)
+            try:
+                result = await call()
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+
+                if isinstance(e, openai.RateLimitError):
+                    self.counters["rate_limited"] += 1
+                else:
+                    self.counters["server_errors"] += 1
+
+                if attempt >= self.max_retries:
+                    self.counters["gave_up"] += 1
+                    raise
+
+                delay = self._backoff(attempt, e)
+                if isinstance(e, openai.RateLimitError):
+                    self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+                    if self._wakeup is not None:
+                        self._wakeup.set()
+
+                self.counters["retries"] += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            used = usage_tokens(result)
+            if used is not None:
+                self.refund(estimated_tokens, used)
+            return result
+
+    # The estimate reserves the call's whole max_tokens; gives back what it did not use.
+    # Streamed responses carry no usage, so their callers refund once the stream ends.
+    def refund(self, estimated_tokens: int, used_tokens: int):
+        self.tokens.refund(estimated_tokens - used_tokens)
+
+    def get_stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        waits = {}
+        for name, stats in self.stats.items():
+            waits[name] = {
+                **stats,
+                "total_wait_ms": round(stats["total_wait_ms"], 1),
+                "max_wait_ms": round(stats["max_wait_ms"], 1),
+                "avg_wait_ms": round(stats["total_wait_ms"] / stats["admitted"], 1) if stats["admitted"] else 0.0
+            }
+        return {
+            "queue_depth": sum(1 for entry in self._queue if not entry[3].done()),
+            "cooldown_remaining_s": round(max(0.0, self._cooldown_until - now), 2),
+            "requests_available": round(self.requests.level, 1),
+            "tokens_available": None if self.tokens.unlimited else round(self.tokens.level),
+            "waits": waits,
+            **self.counters
+        }
@@ -0,0 +1,48 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _counters(self, namespace: str) -> Dict[str, int]:
+        return self.stats.setdefault(namespace, {"calls": 0, "upstream_calls": 0, "coalesced": 0, "abandoned": 0})
+
+    async def do(self, namespace: str, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        counters = self._counters(namespace)
+        counters["calls"] += 1
+        flight_key = f"{namespace}:{key}"
+
+        flight = self._flights.get(flight_key)
+        if flight is None:
+            counters["upstream_calls"] += 1
+            flight = _Flight(asyncio.create_task(fn()))
+            self._flights[flight_key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(flight_key, flight))
+        else:
+            counters["coalesced"] += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                counters["abandoned"] += 1
+                flight.task.cancel()
+                self._forget(flight_key, flight)
+
+    def _forget(self, flight_key: str, flight: _Flight):
+        if self._flights.get(flight_key) is flight:
+            del self._flights[flight_key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._flights), **self.stats}
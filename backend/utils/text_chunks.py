@@ -0,0 +1,126 @@
+import hashlib
+import re
+from typing import List, Tuple
+
+PAGE_BREAK = "\f"
+CHARS_PER_TOKEN = 4
+# Once a chunk is CHUNK_MIN_FILL full, it ends after a page whose content hash falls
+# below SCALE times the page's share of the chunk limit.
+CHUNK_BOUNDARY_SCALE = 2
+CHUNK_MIN_FILL = 0.5
+
+HEADING_PATTERN = re.compile(
+    r"^(?:(?i:section|article|sheet|part|chapter)\s+[\w.-]+\b.*"
+    r"|\d+(?:\.\d+)*\.?\s+[A-Z][^\n]{0,80}"
+    r"|[A-Z][A-Z0-9 &/,'()-]{3,80})$",
+    re.M
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class TextChunk:
+    def __init__(self, text: str, first_page: int, last_page: int):
+        self.text = text
+        self.first_page = first_page
+        self.last_page = last_page
+
+    @property
+    def label(self) -> str:
+        if self.first_page == self.last_page:
+            return f"page {self.first_page}"
+        return f"pages {self.first_page}-{self.last_page}"
+
+
+def _split_sections(page_text: str) -> List[str]:
+    starts = [match.start() for match in HEADING_PATTERN.finditer(page_text) if match.group(0).strip()]
+    bounds = sorted({0, *starts, len(page_text)})
+    return [page_text[start:end] for start, end in zip(bounds, bounds[1:]) if page_text[start:end].strip()]
+
+
+def _split_oversized(section: str, max_chars: int) -> List[str]:
+    pieces, current = [], ""
+    for paragraph in re.split(r"(\n\s*\n)", section):
+        if len(current) + len(paragraph) <= max_chars:
+            current += paragraph
+            continue
+        if current.strip():
+            pieces.append(current)
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind(" ", 0, max_chars)
+            cut = cut if cut > max_chars // 2 else max_chars
+            pieces.append(paragraph[:cut])
+            paragraph = paragraph[cut:]
+        current = paragraph
+    if current.strip():
+        pieces.append(current)
+    return pieces
+
+
+def _page_units(page_text: str, max_chars: int) -> List[str]:
+    units: List[str] = []
+    for section in _split_sections(page_text):
+        units.extend(_split_oversized(section, max_chars) if len(section) > max_chars else [section])
+    return units
+
+
+def _section_units(text: str, max_chars: int) -> List[Tuple[int, str]]:
+    return [
+        (page_number, piece)
+        for page_number, page_text in enumerate(text.split(PAGE_BREAK), start=1)
+        for piece in _page_units(page_text, max_chars)
+    ]
+
+
+def split_into_sections(text: str, max_tokens: int) -> List[TextChunk]:
+    return [
+        TextChunk(piece.strip(), page_number, page_number)
+        for page_number, piece in _section_units(text, max_tokens * CHARS_PER_TOKEN)
+        if piece.strip()
+    ]
+
+
+def _ends_chunk(page_text: str, max_chars: int) -> bool:
+    digest = int.from_bytes(hashlib.blake2b(page_text.encode("utf-8"), digest_size=8).digest(), "big")
+    return digest / 2 ** 64 < CHUNK_BOUNDARY_SCALE * len(page_text) / max_chars
+
+
+# Packs pages into chunks as they arrive, so chunks can be sent for review while
+# later pages are still being extracted. Chunk boundaries are chosen from each
+# page's own content, not by filling chunks greedily from the start: editing a page
+# changes the chunk it falls in (at most also the next one), and every other chunk
+# and its cached review stay the same.
+class ChunkBuilder:
+    def __init__(self, max_tokens: int):
+        self.max_chars = max_tokens * CHARS_PER_TOKEN
+        self.parts: List[str] = []
+        self.size = 0
+        self.first_page = self.last_page = 1
+
+    def add_page(self, page_number: int, page_text: str) -> List[TextChunk]:
+        chunks: List[TextChunk] = []
+        # A page that does not fit starts a new chunk rather than being split across two.
+        if self.parts and self.size + len(page_text) > self.max_chars:
+            chunks.append(self._flush())
+        for piece in _page_units(page_text, self.max_chars):
+            if self.parts and self.size + len(piece) > self.max_chars:
+                chunks.append(self._flush())
+            if not self.parts:
+                self.first_page = page_number
+            self.parts.append(piece if not self.parts or page_number == self.last_page else "\n" + piece)
+            self.size += len(piece)
+            self.last_page = page_number
+        if self.size >= self.max_chars * CHUNK_MIN_FILL and _ends_chunk(page_text, self.max_chars):
+            chunks.append(self._flush())
+        return chunks
+
+    def finish(self) -> List[TextChunk]:
+        return [self._flush()] if self.parts else []
+
+    def _flush(self) -> TextChunk:
+        chunk = TextChunk("".join(self.parts).strip(), self.first_page, self.last_page)
+        self.parts, self.size = [], 0
+        return chunk
+
@@ -35,14 +35,13 @@ const DocumentUpload = ({ onUpload }) => {
     const allowedTypes = [
       'application/pdf',
       'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-      'application/msword',
       'image/jpeg',
       'image/jpg',
       'image/png'
     ];
 
     if (!allowedTypes.includes(file.type)) {
-      alert('Please upload a PDF, DOCX, DOC, or image file.');
+      alert('Please upload a PDF, DOCX, or image file.');
       return;
     }
 
@@ -82,7 +81,7 @@ const DocumentUpload = ({ onUpload }) => {
           id="file-upload"
           className="absolute inset-0 w-full h-full opacity-0 cursor-pointer"
           onChange={handleChange}
-          accept=".pdf,.docx,.doc,.jpg,.jpeg,.png"
+          accept=".pdf,.docx,.jpg,.jpeg,.png"
           disabled={uploading}
         />
         
@@ -101,7 +100,7 @@ const DocumentUpload = ({ onUpload }) => {
                   Drop your permit application here, or click to browse
                 </p>
                 <p className="text-sm text-gray-500 mt-1">
-                  Supports PDF, DOCX, DOC, JPG, PNG (max 10MB)
+                  Supports PDF, DOCX, JPG, PNG (max 10MB)
                 </p>
               </div>
               